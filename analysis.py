@@ -0,0 +1,171 @@
+"""Which clues does a puzzle actually need?
+
+``analyze_clues`` removes each clue in turn and checks whether the rest
+still pin down a unique solution. A clue whose removal leaves the puzzle
+unique is redundant; the others are necessary, and for each of them the
+check records an alternative solution the remaining clues would allow.
+The per-clue checks are independent and run across a process pool; every
+worker propagates the category layout once and adds the remaining clues
+incrementally on top of it.
+
+Redundant clues are not necessarily removable all at once, so the
+minimal clue set is found afterwards by dropping redundant clues one at a
+time, skipping the search whenever a known alternative solution shows the
+drop would break uniqueness.
+"""
+
+import os
+import time
+from multiprocessing import Pool
+
+from puzzle_spec import clue_args, clue_text, compile_layout, load_spec, normalize_spec
+from session import SolverSession
+from solver import clue_holds
+
+_worker_spec = None
+_worker_solution = None
+
+
+class ClueReport:
+    """Outcome of ``analyze_clues`` for one puzzle.
+
+    ``checks`` has one dict per clue, in spec order, with the clue's
+    ``index``, ``text``, whether it is ``redundant``, the ``alternative``
+    solution its removal allows (None for redundant clues), search
+    ``nodes`` and ``seconds``. ``minimal`` lists the indices of a minimal
+    clue set that still has the unique solution.
+    """
+
+    def __init__(self, unique, checks, minimal):
+        self.unique = unique
+        self.checks = checks
+        self.minimal = minimal
+
+    @property
+    def redundant(self):
+        return [check['index'] for check in self.checks if check['redundant']]
+
+    @property
+    def necessary(self):
+        return [check['index'] for check in self.checks if not check['redundant']]
+
+    def __repr__(self):
+        return (f"ClueReport(clues={len(self.checks)}, necessary={len(self.necessary)}, "
+                f"minimal={len(self.minimal)})")
+
+    def as_dict(self):
+        return {
+            'unique': self.unique,
+            'checks': self.checks,
+            'redundant': self.redundant,
+            'necessary': self.necessary,
+            'minimal': self.minimal,
+        }
+
+
+def _init_worker(spec, solution):
+    global _worker_spec, _worker_solution
+    _worker_spec = spec
+    _worker_solution = solution
+    # Propagate the category layout once per process
+    compile_layout(spec).root_domains()
+
+
+def _check_clue(index):
+    """Solve the worker's puzzle without clue ``index``, stopping at two solutions."""
+    spec = _worker_spec
+    start = time.perf_counter()
+    solver = compile_layout(spec).copy()
+    for other, clue in enumerate(spec['clues']):
+        if other != index:
+            solver.add_clue(*clue_args(clue))
+    stats = solver.new_stats()
+    solutions = solver.iter_solutions(stats)
+    found = [solution for _, solution in zip(range(2), solutions)]
+    solutions.close()
+    alternatives = [solution for solution in found if solution != _worker_solution]
+    return {
+        'index': index,
+        'text': clue_text(spec['clues'][index]),
+        'redundant': not alternatives,
+        'alternative': alternatives[0] if alternatives else None,
+        'nodes': stats.nodes,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def minimal_clues(spec, checks, solution):
+    """Indices of a minimal clue set, given the unique ``solution`` and the per-clue ``checks``.
+
+    Necessary clues are always kept. Redundant ones are dropped one at a
+    time, last first, unless the clues left would let an already known
+    alternative solution through.
+    """
+    clues = [clue_args(clue) for clue in spec['clues']]
+    alternatives = [check['alternative'] for check in checks if check['alternative']]
+    session = SolverSession(spec)
+    kept = set(range(len(clues)))
+    for index in reversed(range(len(clues))):
+        if not checks[index]['redundant']:
+            continue
+        rest = [clues[other] for other in kept if other != index]
+        if any(all(clue_holds(*clue, alternative) for clue in rest)
+               for alternative in alternatives):
+            continue
+        session.remove_clue(*clues[index])
+        solutions = session.solutions(2)
+        if len(solutions) == 1:
+            kept.discard(index)
+        else:
+            alternatives.extend(other for other in solutions if other != solution)
+            session.add_clue(*clues[index])
+    return sorted(kept)
+
+
+def analyze_clues(spec, workers=None, solution=None):
+    """Return a ``ClueReport`` for a spec (dict or path).
+
+    Alternatives are solutions other than ``solution``, the one shown to
+    the user; it defaults to the first solution of the bitmask search,
+    which other engines need not agree with on non-unique puzzles.
+    ``workers`` defaults to the number of CPUs; ``workers=1`` checks the
+    clues in the calling process.
+    """
+    if isinstance(spec, (str, os.PathLike)):
+        spec = load_spec(os.fspath(spec))
+    else:
+        spec = normalize_spec(spec)
+    session = SolverSession(spec)
+    unique = session.is_unique()
+    if solution is None:
+        solution = session.first_solution()
+    indices = range(len(spec['clues']))
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(indices)))
+    if workers == 1:
+        _init_worker(spec, solution)
+        checks = [_check_clue(index) for index in indices]
+    else:
+        with Pool(workers, _init_worker, (spec, solution)) as pool:
+            checks = pool.map(_check_clue, indices)
+    minimal = minimal_clues(spec, checks, solution) if unique else list(indices)
+    return ClueReport(unique, checks, minimal)
+
+
+if __name__ == '__main__':
+    import argparse
+    from puzzle_spec import STOCK_SPEC
+    parser = argparse.ArgumentParser(description="Report necessary and redundant clues")
+    parser.add_argument('spec', nargs='?', default=STOCK_SPEC)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    report = analyze_clues(args.spec, args.workers)
+    if not report.unique:
+        print("The puzzle does not have a unique solution")
+    for check in report.checks:
+        status = 'redundant' if check['redundant'] else 'necessary'
+        marker = '*' if check['index'] in report.minimal else ' '
+        print(f"{marker} {check['index'] + 1:>3}. {status:<9} {check['text']}")
+    print(f"\n{len(report.necessary)} necessary, {len(report.redundant)} redundant; "
+          f"minimal set (*) has {len(report.minimal)} clues")
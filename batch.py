@@ -0,0 +1,84 @@
+"""Solve many independent puzzle instances across a process pool.
+
+    for result in solve_many(specs, workers=8):
+        print(result.index, result.solution_count, result.seconds)
+
+``specs`` may mix spec dicts and paths to spec files; paths are loaded in
+the worker so only the file name crosses the process boundary. Results are
+streamed back in completion order and carry the index of their spec.
+"""
+
+import os
+import time
+from multiprocessing import Pool
+
+from puzzle_spec import compile_spec, load_spec, normalize_spec
+
+
+class SolveResult:
+    """Outcome of solving one puzzle instance."""
+
+    __slots__ = ('index', 'key', 'solution', 'solution_count', 'seconds', 'stats')
+
+    def __init__(self, index, key, solution, solution_count, seconds, stats=None):
+        self.index = index
+        self.key = key
+        self.solution = solution
+        self.solution_count = solution_count
+        self.seconds = seconds
+        self.stats = stats
+
+    def __repr__(self):
+        return (f"SolveResult(index={self.index}, solution_count={self.solution_count}, "
+                f"seconds={self.seconds:.6f})")
+
+    def as_dict(self):
+        result = {name: getattr(self, name) for name in self.__slots__}
+        if self.stats is not None:
+            result['stats'] = self.stats.as_dict()
+        return result
+
+
+def solve_spec(spec, index=0, max_solutions=None):
+    """Compile and solve a single spec (dict or path) into a ``SolveResult``.
+
+    ``max_solutions`` stops the search early; the reported count then
+    saturates at that limit (use 2 for a uniqueness check).
+    """
+    start = time.perf_counter()
+    if isinstance(spec, (str, os.PathLike)):
+        spec = load_spec(os.fspath(spec))
+    else:
+        spec = normalize_spec(spec)
+    plan = compile_spec(spec)
+    stats = plan.new_stats()
+    solution, count = plan.first_and_count(max_solutions, stats)
+    return SolveResult(index, plan.key, solution, count, time.perf_counter() - start, stats)
+
+
+def _solve_indexed(item):
+    index, spec, max_solutions = item
+    return solve_spec(spec, index, max_solutions)
+
+
+def solve_many(specs, workers=None, chunksize=None, max_solutions=None):
+    """Yield a ``SolveResult`` for every spec as soon as it is solved.
+
+    ``workers`` defaults to the number of CPUs; ``workers=1`` solves in the
+    calling process, which is handy for debugging and profiling.
+    ``max_solutions`` is passed on to ``solve_spec``.
+    """
+    items = [(index, spec, max_solutions) for index, spec in enumerate(specs)]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(items)))
+    if workers == 1:
+        for item in items:
+            yield _solve_indexed(item)
+        return
+    if chunksize is None:
+        # A few chunks per worker keeps IPC overhead low while still
+        # balancing instances of uneven difficulty
+        chunksize = max(1, len(items) // (workers * 4))
+    with Pool(workers) as pool:
+        yield from pool.imap_unordered(_solve_indexed, items, chunksize)
@@ -0,0 +1,277 @@
+"""Render reports for many solved puzzles through reusable figure templates.
+
+``Visualization`` builds every figure from scratch, which is fine for one
+puzzle but wasteful for thousands. Here each template creates its figure,
+patches and table cells once per puzzle shape (categories and houses) and
+``fill`` only swaps their text and face colours, so rendering page after
+page allocates no new artists and memory stays flat however long the
+report is.
+
+Templates are plain ``matplotlib.figure.Figure`` objects, never registered
+with pyplot, so they are freed as soon as the renderer drops them:
+
+- ``layout``  one house layout per page (as ``create_house_layout``)
+- ``matrix``  one solution matrix per page (as ``create_solution_matrix``)
+- ``sheet``   a contact sheet of compact solution matrices, many per page
+
+    render_batch(tables, 'report.pdf', template='sheet')
+
+writes a multi-page PDF; any other output is a directory that receives
+one PNG per page.
+"""
+
+import os
+
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.collections import PatchCollection
+from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle
+
+from house_table import HouseTable
+from puzzle_spec import category_label
+from visualization import CATEGORY_TINTS, house_facecolor
+
+SHEET_ROWS = 6
+SHEET_COLS = 3
+
+
+def _style_matrix(table, num_categories, num_houses):
+    """Header colours and per-category tints, as in the solution matrix figure."""
+    for (row, col), cell in table.get_celld().items():
+        if row == 0 or col == 0:
+            cell.set_text_props(weight='bold', color='w')
+            cell.set_facecolor('#40465e')
+        elif row <= num_categories and col <= num_houses:
+            cell.set_facecolor(CATEGORY_TINTS[(row - 1) % len(CATEGORY_TINTS)])
+
+
+def _matrix_table(ax, categories, houses):
+    """An empty solution table on ``ax``; returns it for later ``_fill_matrix`` calls."""
+    cells = [[''] + [f'House {house}' for house in range(1, houses + 1)]]
+    cells.extend([category_label(category)] + [''] * houses for category in categories)
+    table = ax.table(cellText=cells, loc='center', cellLoc='center')
+    _style_matrix(table, len(categories), houses)
+    ax.axis('off')
+    return table
+
+
+def _fill_matrix(table, solution):
+    for row, category in enumerate(solution, 1):
+        for house, value in enumerate(solution[category], 1):
+            table[(row, house)].get_text().set_text(str(value))
+
+
+class HouseLayoutTemplate:
+    """The house layout figure for one puzzle shape, one solution per page."""
+
+    capacity = 1
+
+    def __init__(self, categories, houses):
+        self.categories = list(categories)
+        self.figure = Figure(figsize=(max(15, 3 * houses), 8))
+        ax = self.figure.add_subplot()
+        self._houses = []
+        for house in range(1, houses + 1):
+            rect = Rectangle((house - 0.4, -0.4), 0.8, 0.8,
+                             edgecolor='black', facecolor='lightgray', alpha=0.7)
+            ax.add_patch(rect)
+            ax.text(house, 0.4, f'House {house}', ha='center', va='center',
+                    fontsize=12, fontweight='bold')
+            texts = [ax.text(house, -0.2 - i * 0.2, '', ha='center', va='center', fontsize=10)
+                     for i in range(len(self.categories))]
+            self._houses.append((rect, texts))
+        ax.set_xlim(0, houses + 1)
+        ax.set_ylim(-0.4 - 0.2 * len(self.categories), 2)
+        ax.axis('off')
+        self._title = ax.set_title('')
+
+    def fill(self, items):
+        """Draw the single ``(title, solution)`` pair in ``items``."""
+        (title, solution), = items
+        for index, (rect, texts) in enumerate(self._houses):
+            rect.set_facecolor(house_facecolor(solution, index))
+            for text, category in zip(texts, self.categories):
+                text.set_text(f"{category_label(category)}: {solution[category][index]}")
+        self._title.set_text(title)
+
+    def close(self):
+        self.figure.clear()
+
+
+class MatrixTemplate:
+    """The solution matrix figure for one puzzle shape, one solution per page."""
+
+    capacity = 1
+
+    def __init__(self, categories, houses):
+        self.figure = Figure(figsize=(max(12, 2 * houses), max(8, len(categories))))
+        ax = self.figure.add_subplot()
+        self._table = _matrix_table(ax, categories, houses)
+        self._title = ax.set_title('')
+
+    def fill(self, items):
+        """Draw the single ``(title, solution)`` pair in ``items``."""
+        (title, solution), = items
+        _fill_matrix(self._table, solution)
+        self._title.set_text(title)
+
+    def close(self):
+        self.figure.clear()
+
+
+class ContactSheet:
+    """A grid of compact solution matrices, ``rows * cols`` solutions per page.
+
+    The whole sheet is one axes: each slot's cell backgrounds are a single
+    ``PatchCollection`` and its values plain text artists, which draws far
+    faster than a dozen ``Table`` objects with a patch per cell.
+    """
+
+    def __init__(self, categories, houses, rows=SHEET_ROWS, cols=SHEET_COLS):
+        self.capacity = rows * cols
+        # A4 portrait
+        self.figure = Figure(figsize=(8.27, 11.69))
+        ax = self.figure.add_axes((0.02, 0.02, 0.96, 0.96))
+        # One unit per slot, y growing downwards like the page
+        ax.set_xlim(0, cols)
+        ax.set_ylim(rows, 0)
+        ax.axis('off')
+        fontsize = max(3, 6 - max(houses, len(categories)) // 4)
+        widths = [0.24] + [0.72 / houses] * houses
+        height = min(0.12, 0.8 / (len(categories) + 1))
+        # Wide puzzles only have room for the house number
+        house_label = (lambda house: f'House {house}') if houses <= 6 else str
+        self._slots = []
+        for index in range(self.capacity):
+            x, y = index % cols + 0.02, index // cols + 0.12
+            patches, colors, artists, values = [], [], [], []
+            for row in range(len(categories) + 1):
+                left = x
+                for col, width in enumerate(widths):
+                    patches.append(Rectangle((left, y + row * height), width, height))
+                    center = (left + width / 2, y + (row + 0.5) * height)
+                    if row == 0 or col == 0:
+                        colors.append('#40465e')
+                        label = (category_label(categories[row - 1]) if col == 0 and row
+                                 else house_label(col) if col else '')
+                        artists.append(ax.text(*center, label, ha='center', va='center',
+                                               fontsize=fontsize, color='w', fontweight='bold'))
+                    else:
+                        colors.append(CATEGORY_TINTS[(row - 1) % len(CATEGORY_TINTS)])
+                        values.append(ax.text(*center, '', ha='center', va='center',
+                                              fontsize=fontsize))
+                    left += width
+            cells = PatchCollection(patches, facecolors=colors, edgecolors='black',
+                                    linewidths=0.4)
+            ax.add_collection(cells)
+            title = ax.text(x + 0.48, y - 0.03, '', ha='center', va='bottom', fontsize=8)
+            self._slots.append(([cells, title, *artists, *values], title, values))
+
+    def fill(self, items):
+        """Draw up to ``capacity`` ``(title, solution)`` pairs, hiding unused slots."""
+        for index, (artists, title, values) in enumerate(self._slots):
+            visible = index < len(items)
+            for artist in artists:
+                artist.set_visible(visible)
+            if visible:
+                label, solution = items[index]
+                title.set_text(label)
+                cells = iter(values)
+                for category in solution:
+                    for value in solution[category]:
+                        next(cells).set_text(str(value))
+
+    def close(self):
+        self.figure.clear()
+
+
+TEMPLATES = {'layout': HouseLayoutTemplate, 'matrix': MatrixTemplate, 'sheet': ContactSheet}
+
+
+def _pages(solutions, categories, titles):
+    """Group ``(shape, [(title, table), ...])`` pages of consecutive same-shape solutions.
+
+    Pages are cut at ``SHEET_ROWS * SHEET_COLS`` items; single-solution
+    templates just take the items one at a time.
+    """
+    page = []
+    shape = None
+    for index, solution in enumerate(solutions):
+        if isinstance(solution, HouseTable) or categories is None:
+            table = HouseTable.from_rows(solution)
+        else:
+            table = HouseTable(solution, categories)
+        title = titles[index] if titles is not None else f'Puzzle {index + 1}'
+        key = (tuple(table), table.houses)
+        if page and (key != shape or len(page) == SHEET_ROWS * SHEET_COLS):
+            yield shape, page
+            page = []
+        shape = key
+        page.append((title, table))
+    if page:
+        yield shape, page
+
+
+def render_batch(solutions, output, template='sheet', categories=None, titles=None, dpi=None):
+    """Render every solution into ``output`` and return the number of pages.
+
+    ``solutions`` are ``HouseTable`` objects or ``{category: [value by
+    house]}`` rows; with ``categories`` they may also be the ``{value:
+    house}`` dicts the solvers return. They are consumed lazily, so a
+    generator keeps a long run in constant memory. ``titles`` defaults to
+    "Puzzle <n>".
+
+    An ``output`` ending in ``.pdf`` becomes one multi-page PDF; otherwise
+    it is a directory that receives ``page-00001.png`` and so on. One
+    template is kept per puzzle shape and closed when rendering ends.
+    """
+    if template not in TEMPLATES:
+        raise ValueError(f"template must be one of {tuple(TEMPLATES)}, got {template!r}")
+    factory = TEMPLATES[template]
+    templates = {}
+    pages = 0
+    pdf = None
+    if output.endswith('.pdf'):
+        pdf = PdfPages(output)
+    else:
+        os.makedirs(output, exist_ok=True)
+    try:
+        for shape, items in _pages(solutions, categories, titles):
+            if shape not in templates:
+                templates[shape] = factory(*shape)
+            current = templates[shape]
+            for start in range(0, len(items), current.capacity):
+                current.fill(items[start:start + current.capacity])
+                pages += 1
+                if pdf is not None:
+                    pdf.savefig(current.figure, dpi=dpi)
+                else:
+                    current.figure.savefig(os.path.join(output, f'page-{pages:05d}.png'),
+                                           dpi=dpi)
+    finally:
+        for current in templates.values():
+            current.close()
+        if pdf is not None:
+            pdf.close()
+    return pages
+
+
+if __name__ == '__main__':
+    import argparse
+    from batch import solve_many
+    from puzzle_spec import load_spec
+    parser = argparse.ArgumentParser(description="Solve puzzle specs and render them in one report")
+    parser.add_argument('specs', nargs='+', help="puzzle spec files")
+    parser.add_argument('--output', default='report.pdf',
+                        help="PDF file, or a directory for PNG pages (default: report.pdf)")
+    parser.add_argument('--template', choices=tuple(TEMPLATES), default='sheet')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    specs = [load_spec(path) for path in args.specs]
+    results = sorted(solve_many(specs, args.workers), key=lambda result: result.index)
+    solved = [(path, HouseTable(result.solution, spec['categories'], spec['houses']))
+              for path, spec, result in zip(args.specs, specs, results)
+              if result.solution is not None]
+    pages = render_batch((table for _, table in solved), args.output, args.template,
+                         titles=[os.path.basename(path) for path, _ in solved])
+    print(f"Rendered {len(solved)} of {len(specs)} puzzles on {pages} pages to {args.output}")
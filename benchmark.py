@@ -0,0 +1,1058 @@
+"""Scaling benchmarks for the Zebra puzzle solver.
+
+Generates random Einstein-style puzzles of increasing size and records
+solve time and peak memory for each house count N and category count K::
+
+    python benchmark.py
+    python benchmark.py --houses 5 8 10 12 --categories 5 6 8 --json results.json
+    python benchmark.py --compare-orderings
+    python benchmark.py --cold-start --budget-ms 50
+    python benchmark.py --import-writes
+    python benchmark.py --transform
+    python benchmark.py --generate
+    python benchmark.py --session
+    python benchmark.py --engines
+    python benchmark.py --trace
+    python benchmark.py --layout
+    python benchmark.py --render-batch --puzzles 10000
+    python benchmark.py --serve
+    python benchmark.py --symmetry
+    python benchmark.py --stages --save-baseline baseline.json
+    python benchmark.py --stages --baseline baseline.json --profile profile/
+
+Every generated puzzle is consistent with a hidden random assignment, so it
+always has at least one solution.
+"""
+
+import argparse
+import asyncio
+import functools
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from generator import PuzzleGenerator, candidate_clues, random_assignment
+from house_table import HouseTable
+from ordering import VARIABLE_ORDERINGS, VALUE_ORDERINGS
+from propagation import propagation_report
+from puzzle_spec import (ENGINES, STOCK_SPEC, clue_args, clue_spec, clue_text, compile_spec,
+                         load_spec, normalize_spec, PlanCache)
+from session import SolverSession
+from solve_trace import Trace
+from solver import SAME_HOUSE, NEXT_TO, RIGHT_OF, AT_POSITION
+
+
+def random_spec(houses, categories, seed=0, clues_per_value=1.5):
+    """Build a random puzzle spec whose clues hold for a hidden assignment.
+
+    ``clues_per_value`` scales the clue count with the ``houses * categories``
+    values in the puzzle; lower ratios leave more solutions open.
+    """
+    rng = random.Random(seed)
+    names = {
+        f'c{k}': [f'c{k}v{i}' for i in range(houses)]
+        for k in range(categories)
+    }
+    # Hidden assignment: every category is a random permutation of the houses
+    placement = {}
+    for values in names.values():
+        for value, house in zip(values, rng.sample(range(1, houses + 1), houses)):
+            placement[value] = house
+    by_house = {}
+    for value, house in placement.items():
+        by_house.setdefault(house, []).append(value)
+
+    clues = []
+    all_values = list(placement)
+    for _ in range(max(1, int(clues_per_value * houses * categories))):
+        kind = rng.choice((SAME_HOUSE, SAME_HOUSE, NEXT_TO, RIGHT_OF, AT_POSITION))
+        a = rng.choice(all_values)
+        house = placement[a]
+        if kind == AT_POSITION:
+            clues.append({'type': kind, 'a': a, 'house': house})
+            continue
+        if kind == SAME_HOUSE:
+            target = house
+        elif kind == RIGHT_OF:
+            target = house - 1
+        else:
+            target = rng.choice([h for h in (house - 1, house + 1) if 1 <= h <= houses])
+        candidates = [v for v in by_house.get(target, []) if v != a]
+        if not candidates:
+            continue
+        clues.append({'type': kind, 'a': a, 'b': rng.choice(candidates)})
+    return {'houses': houses, 'categories': names, 'clues': clues}
+
+
+def measure(spec, propagation=True):
+    """Solve ``spec`` once untraced for timing and once under tracemalloc."""
+    plan = compile_spec(spec, cache=PlanCache())
+    plan.solver.propagation = propagation
+    report = propagation_report(plan.solver)
+    stats = plan.new_stats()
+    start = time.perf_counter()
+    solutions = plan.count_solutions(stats=stats, engine='bitmask')
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    plan.count_solutions(engine='bitmask')
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'houses': spec['houses'],
+        'categories': len(spec['categories']),
+        'clues': len(spec['clues']),
+        'solutions': solutions,
+        'seconds': elapsed,
+        'nodes': stats.nodes,
+        'backtracks': stats.backtracks,
+        'peak_kib': peak / 1024,
+        'log10_space_before': report['log10_space_before'],
+        'log10_space_after': report['log10_space_after'],
+    }
+
+
+def run(houses, categories, seeds, clues_per_value, propagation=True):
+    results = []
+    for n in houses:
+        for k in categories:
+            for seed in range(seeds):
+                result = measure(random_spec(n, k, seed, clues_per_value), propagation)
+                result['seed'] = seed
+                results.append(result)
+                print(f"N={n:<3} K={k:<3} seed={seed:<3} clues={result['clues']:<4} "
+                      f"solutions={result['solutions']:<6} nodes={result['nodes']:<7} "
+                      f"time={result['seconds'] * 1000:9.2f} ms "
+                      f"peak={result['peak_kib']:9.1f} KiB "
+                      f"space=10^{result['log10_space_before']:.1f}"
+                      f"->10^{result['log10_space_after']:.1f}")
+                sys.stdout.flush()
+    return results
+
+
+def compare_orderings(specs, repeat=5, propagation=True):
+    """Node counts and best-of-``repeat`` latency for every ordering pair."""
+    results = []
+    for name, spec in specs:
+        plan = compile_spec(spec, cache=PlanCache())
+        plan.solver.propagation = propagation
+        plan.solver.root_domains()
+        for variable_order in VARIABLE_ORDERINGS:
+            for value_order in VALUE_ORDERINGS:
+                best = None
+                for _ in range(repeat):
+                    stats = plan.new_stats()
+                    start = time.perf_counter()
+                    solutions = plan.count_solutions(
+                        stats=stats, engine='bitmask',
+                        variable_order=variable_order, value_order=value_order)
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                result = {
+                    'puzzle': name,
+                    'variable_order': variable_order,
+                    'value_order': value_order,
+                    'solutions': solutions,
+                    'nodes': stats.nodes,
+                    'backtracks': stats.backtracks,
+                    'seconds': best,
+                }
+                results.append(result)
+                print(f"{name:<14} {variable_order:<11} {value_order:<10} "
+                      f"nodes={stats.nodes:<7} backtracks={stats.backtracks:<7} "
+                      f"time={best * 1000:9.3f} ms")
+                sys.stdout.flush()
+    return results
+
+
+def ordering_specs(houses, categories, seeds, clues_per_value):
+    """The stock puzzle followed by generated variants of every size."""
+    specs = [('stock', load_spec(STOCK_SPEC))]
+    for n in houses:
+        for k in categories:
+            for seed in range(seeds):
+                specs.append((f'N{n}K{k}s{seed}', random_spec(n, k, seed, clues_per_value)))
+    return specs
+
+
+def scan_table(solution, categories, houses):
+    """The former per-house ``next()`` scan, kept as a reference point."""
+    rows = {category: [] for category in categories}
+    for house in range(1, houses + 1):
+        for category, values in categories.items():
+            rows[category].append(
+                next(k for k, v in solution.items() if v == house and k in values))
+    return rows
+
+
+def transform_scaling(sizes=(5, 10, 20, 40, 80), repeat=5, scan_limit=400):
+    """Time the solution-to-house-table transform as N = K grows.
+
+    The ``ns/value`` column stays flat for ``HouseTable`` (linear in N*K);
+    the old scan is only timed up to ``scan_limit`` values.
+    """
+    results = []
+    for size in sizes:
+        rng = random.Random(size)
+        categories = {
+            f'c{k}': [f'c{k}v{i}' for i in range(size)] for k in range(size)
+        }
+        solution = {}
+        for values in categories.values():
+            for value, house in zip(values, rng.sample(range(1, size + 1), size)):
+                solution[value] = house
+        count = size * size
+        timings = {}
+        transforms = [('house_table', lambda: HouseTable(solution, categories, size))]
+        if count <= scan_limit:
+            transforms.append(('scan', lambda: scan_table(solution, categories, size)))
+        for name, transform in transforms:
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                transform()
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            timings[name] = best
+        result = {'houses': size, 'categories': size, 'values': count,
+                  'house_table_seconds': timings['house_table'],
+                  'scan_seconds': timings.get('scan')}
+        results.append(result)
+        scan = (f"{timings['scan'] * 1e9 / count:10.0f} ns/value"
+                if 'scan' in timings else f"{'-':>10} ns/value")
+        print(f"N=K={size:<4} values={count:<6} "
+              f"house_table={timings['house_table'] * 1e9 / count:7.0f} ns/value "
+              f"scan={scan}")
+        sys.stdout.flush()
+    return results
+
+
+def naive_generate(categories, rng):
+    """The old external loop: add a random true clue, re-solve from scratch."""
+    houses = len(next(iter(categories.values())))
+    target = random_assignment(categories, rng)
+    pool = candidate_clues(target, categories, houses)
+    rng.shuffle(pool)
+    clues = []
+    while True:
+        clues.append(clue_spec(*pool.pop()))
+        spec = {'houses': houses, 'categories': categories, 'clues': clues}
+        if compile_spec(spec, PlanCache()).count_solutions(2) == 1:
+            return spec
+
+
+def generate_puzzles(count=20, seed=0):
+    """Time the incremental generator against the re-solve-every-step loop.
+
+    Each generated puzzle is re-solved from scratch to confirm that its
+    target is the one and only solution.
+    """
+    categories = load_spec(STOCK_SPEC)['categories']
+    generator = PuzzleGenerator(categories, seed)
+    start = time.perf_counter()
+    puzzles = [generator.generate(minimize=False) for _ in range(count)]
+    incremental = time.perf_counter() - start
+    unique = sum(compile_spec(normalize_spec(spec), PlanCache()).first_and_count(2) == (target, 1)
+                 for spec, target in puzzles)
+
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    naive_clues = sum(len(naive_generate(categories, rng)['clues']) for _ in range(count))
+    naive = time.perf_counter() - start
+
+    start = time.perf_counter()
+    minimized = [generator.generate() for _ in range(count)]
+    minimizing = time.perf_counter() - start
+    unique += sum(compile_spec(normalize_spec(spec), PlanCache()).first_and_count(2) == (target, 1)
+                  for spec, target in minimized)
+
+    result = {
+        'puzzles': count,
+        'incremental_seconds': incremental,
+        'incremental_clues': sum(len(spec['clues']) for spec, _ in puzzles) / count,
+        'naive_seconds': naive,
+        'naive_clues': naive_clues / count,
+        'minimized_seconds': minimizing,
+        'minimized_clues': sum(len(spec['clues']) for spec, _ in minimized) / count,
+        'counters': dict(generator.counters),
+        'ok': unique == 2 * count,
+    }
+    print(f"incremental: {incremental / count * 1e3:7.2f} ms/puzzle "
+          f"{result['incremental_clues']:5.1f} clues")
+    print(f"naive:       {naive / count * 1e3:7.2f} ms/puzzle "
+          f"{result['naive_clues']:5.1f} clues")
+    print(f"minimized:   {minimizing / count * 1e3:7.2f} ms/puzzle "
+          f"{result['minimized_clues']:5.1f} clues")
+    print(f"unique: {unique}/{2 * count} -> {'OK' if result['ok'] else 'FAIL'}")
+    return result
+
+
+def session_edits(path=STOCK_SPEC):
+    """Remove and re-add each clue of a puzzle, timing the re-solve after each edit.
+
+    Every edited puzzle's solution count is checked against a fresh compile.
+    """
+    session = SolverSession.from_path(path)
+    session.solutions()
+    timings = {'remove': [], 'add': []}
+    ok = True
+    for clue in session.clues:
+        for edit, apply in (('remove', session.remove_clue), ('add', session.add_clue)):
+            start = time.perf_counter()
+            apply(*clue)
+            count = session.count_solutions()
+            timings[edit].append(time.perf_counter() - start)
+            ok = ok and count == compile_spec(session.spec(), PlanCache()).count_solutions()
+    result = {edit: {'median_ms': statistics.median(values) * 1e3,
+                     'max_ms': max(values) * 1e3}
+              for edit, values in timings.items()}
+    result['ok'] = ok
+    for edit in ('remove', 'add'):
+        print(f"{edit:<7} + re-solve: median {result[edit]['median_ms']:6.2f} ms, "
+              f"max {result[edit]['max_ms']:6.2f} ms")
+    print(f"solution counts match a fresh solve -> {'OK' if ok else 'FAIL'}")
+    return result
+
+
+ENGINE_SIZES = ((5, 5), (6, 6), (7, 6), (8, 6), (8, 8), (10, 6))
+
+
+def engine_crossover(sizes=ENGINE_SIZES, puzzles=3, seed=0, check_seeds=10):
+    """Bitmask vs SAT latency on clue-minimal generated puzzles of growing size.
+
+    Generated puzzles are the hard case: propagation leaves most values
+    open, so the bitmask search branches a lot. Each one is solved by both
+    backends (stopping at the second solution) and the answers compared;
+    ``auto`` shows the engine ``sat.choose_engine`` picks. The solution
+    sets of ``check_seeds`` under-constrained random puzzles are compared
+    in full as well.
+    """
+    results = []
+    ok = True
+    for houses, categories in sizes:
+        names = {f'c{k}': [f'c{k}v{i}' for i in range(houses)] for k in range(categories)}
+        generator = PuzzleGenerator(names, seed, variable_order='mrv')
+        for index in range(puzzles):
+            spec, target = generator.generate()
+            result = {'houses': houses, 'categories': categories, 'puzzle': index,
+                      'clues': len(spec['clues'])}
+            for engine in ENGINES[1:]:
+                plan = compile_spec(spec, PlanCache())
+                start = time.perf_counter()
+                answer = plan.first_and_count(2, engine=engine)
+                result[f'{engine}_seconds'] = time.perf_counter() - start
+                ok = ok and answer == (target, 1)
+            result['auto'] = plan.engine().__class__.__name__
+            results.append(result)
+            print(f"N={houses:<3} K={categories:<3} clues={result['clues']:<4} "
+                  f"bitmask={result['bitmask_seconds'] * 1000:9.2f} ms "
+                  f"sat={result['sat_seconds'] * 1000:9.2f} ms "
+                  f"auto={result['auto']}")
+            sys.stdout.flush()
+    for check in range(check_seeds):
+        plan = compile_spec(normalize_spec(random_spec(6, 5, check, 0.8)), PlanCache())
+        solutions = [sorted(sorted(solution.items()) for solution in plan.iter_solutions(engine=engine))
+                     for engine in ENGINES[1:]]
+        ok = ok and solutions[0] == solutions[1]
+    print(f"identical solutions from both engines -> {'OK' if ok else 'FAIL'}")
+    return {'results': results, 'ok': ok}
+
+
+def trace_overhead(repeat=5, maxlen=1024, seed=0):
+    """Cost of recording a solver trace on a search-heavy generated puzzle.
+
+    Counts every solution of a clue-minimal 8 x 8 puzzle with one clue
+    removed, untraced and traced, and checks that the ring buffer never
+    holds more than ``maxlen`` events.
+    """
+    names = {f'c{k}': [f'c{k}v{i}' for i in range(8)] for k in range(8)}
+    spec, _ = PuzzleGenerator(names, seed, variable_order='mrv').generate()
+    spec['clues'].pop()
+    plan = compile_spec(spec, PlanCache())
+    plan.solver.root_domains()
+    timings = {}
+    trace = Trace(maxlen)
+    for name, make_trace in (('untraced', lambda: None), ('traced', lambda: trace)):
+        best = None
+        for _ in range(repeat):
+            trace.clear()
+            stats = plan.new_stats(make_trace())
+            start = time.perf_counter()
+            plan.count_solutions(stats=stats, engine='bitmask')
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = best
+    result = {
+        'nodes': stats.nodes,
+        'untraced_seconds': timings['untraced'],
+        'traced_seconds': timings['traced'],
+        'overhead': timings['traced'] / timings['untraced'] - 1,
+        'events': trace.total,
+        'buffered': len(trace),
+        'ok': len(trace) <= maxlen,
+    }
+    print(f"nodes={result['nodes']} untraced={timings['untraced'] * 1000:.2f} ms "
+          f"traced={timings['traced'] * 1000:.2f} ms overhead={result['overhead']:+.1%}")
+    print(f"{trace.total} events, {len(trace)} buffered (maxlen {maxlen}) "
+          f"-> {'OK' if result['ok'] else 'FAIL'}")
+    return result
+
+
+def layout_cache(repeat=5):
+    """Constraint-graph layout time without and with the on-disk cache.
+
+    Also checks that the seeded layout is identical across computations.
+    Imports networkx, so it only runs on request.
+    """
+    from graph_layout import cached_layout, constraint_graph
+    names = {f'c{k}': [f'c{k}v{i}' for i in range(8)] for k in range(8)}
+    specs = [('stock', load_spec(STOCK_SPEC)),
+             ('generated 8x8', PuzzleGenerator(names, 0).generate()[0])]
+    results = []
+    ok = True
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for name, spec in specs:
+            graph = constraint_graph(spec)
+            timings = {}
+            layouts = []
+            for mode, directory in (('uncached', None), ('cached', cache_dir)):
+                best = None
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    layouts.append(cached_layout(graph, directory))
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                timings[mode] = best
+            same = all(layout == layouts[0] for layout in layouts)
+            ok = ok and same
+            results.append({'puzzle': name, 'nodes': graph.number_of_nodes(),
+                            'edges': graph.number_of_edges(),
+                            'uncached_seconds': timings['uncached'],
+                            'cached_seconds': timings['cached'], 'deterministic': same})
+            print(f"{name:<14} nodes={graph.number_of_nodes():<4} "
+                  f"layout={timings['uncached'] * 1000:8.2f} ms "
+                  f"cached={timings['cached'] * 1000:6.2f} ms deterministic={same}")
+    return {'results': results, 'ok': ok}
+
+
+def batch_rendering(count=10000, template='sheet', baseline=30, seed=0):
+    """Time and memory of rendering ``count`` solutions into one multi-page PDF.
+
+    Counts live objects (``gc.get_objects()``) once per page's worth of
+    solutions; tracemalloc would slow matplotlib down several times over.
+    Fails when the count grows by more than 5% between the first fifth of
+    the run, once matplotlib's bounded caches are warm, and the end, or
+    when any pyplot figure is left open. ``baseline`` solutions are also
+    rendered one figure per call with ``Visualization`` for comparison.
+    """
+    import matplotlib.pyplot as plt
+    from batch_render import SHEET_COLS, SHEET_ROWS, render_batch
+    from visualization import Visualization
+    categories = load_spec(STOCK_SPEC)['categories']
+    rng = random.Random(seed)
+    per_page = SHEET_ROWS * SHEET_COLS if template == 'sheet' else 1
+    samples = []
+
+    def solutions():
+        for index in range(count):
+            if index % per_page == 0:
+                samples.append(len(gc.get_objects()))
+            yield random_assignment(categories, rng)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        for _ in range(baseline):
+            table = HouseTable(random_assignment(categories, rng), categories)
+            Visualization(os.path.join(tmp, 'figures')).create_solution_matrix(table)
+        per_figure = (time.perf_counter() - start) / baseline
+        path = os.path.join(tmp, 'report.pdf')
+        start = time.perf_counter()
+        pages = render_batch(solutions(), path, template, categories=categories)
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(path)
+    samples.append(len(gc.get_objects()))
+    warm = samples[len(samples) // 5]
+    growth = samples[-1] / warm - 1
+    open_figures = len(plt.get_fignums())
+    result = {
+        'solutions': count,
+        'template': template,
+        'pages': pages,
+        'seconds': elapsed,
+        'pdf_bytes': size,
+        'object_samples': samples,
+        'object_growth': growth,
+        'per_figure_seconds': per_figure,
+        'open_figures': open_figures,
+        'ok': growth < 0.05 and open_figures == 0,
+    }
+    print(f"{count} solutions on {pages} pages in {elapsed:.1f} s "
+          f"({elapsed / count * 1000:.2f} ms per solution, {size / 1e6:.1f} MB PDF)")
+    print(f"one Visualization figure per solution: {per_figure * 1000:.1f} ms per solution")
+    print(f"live objects {warm} after 20%, {samples[-1]} at the end ({growth:+.1%}), "
+          f"{open_figures} figures left open -> {'OK' if result['ok'] else 'FAIL'}")
+    return result
+
+
+async def _http_post(port, path, body):
+    """POST ``body`` to the local server; returns ``(status, payload)``."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Length: {len(body)}\r\n"
+                 f"Connection: close\r\n\r\n".encode('latin-1') + body)
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    head, _, payload = data.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(payload)
+
+
+def serve_requests(puzzles=20, duplicates=8, workers=2, seed=0):
+    """Latency of the HTTP solve service against running ``zebra_puzzle.py`` per request.
+
+    Sends ``duplicates`` concurrent identical requests for each of
+    ``puzzles`` generated puzzles, then the same requests again, then
+    relabeled (half of them mirrored) copies of the puzzles. Fails unless
+    every puzzle was solved exactly once (the rest coalesced or cached)
+    and every answer matches an in-process solve of the spec sent.
+    """
+    from server import SolveService, house_rows, solve_request
+    rng = random.Random(seed)
+    specs = [PuzzleGenerator(seed=seed + i).generate()[0] for i in range(puzzles)]
+    copies = [relabeled(spec, rng, mirror=i % 2 == 1) for i, spec in enumerate(specs)]
+    rounds_specs = (specs, specs, copies)
+    expected = {}
+    for spec in specs + copies:
+        want = solve_request(normalize_spec(spec))
+        want['houses'] = house_rows(spec, want['solution'])
+        # Stats rows must name the values of the spec sent, not of the one solved
+        want['labels'] = sorted(
+            [f'{kind}({a}, {b})' for kind, a, b in map(clue_args, spec['clues'])]
+            + [f'all_different({name})' for name in spec['categories']])
+        expected[id(spec)] = want
+
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, 'zebra_puzzle.py', '--render', 'none'], check=True,
+                       capture_output=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        timings.append(time.perf_counter() - start)
+    subprocess_seconds = statistics.median(timings)
+
+    async def run():
+        service = SolveService(workers)
+        server = await service.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        rounds = []
+        try:
+            for round_specs in rounds_specs:
+                bodies = [json.dumps(spec).encode('utf-8') for spec in round_specs]
+                start = time.perf_counter()
+                replies = await asyncio.gather(*(_http_post(port, '/solve', body)
+                                                 for body in bodies for _ in range(duplicates)))
+                rounds.append((time.perf_counter() - start, replies))
+        finally:
+            server.close()
+            await server.wait_closed()
+            service.close()
+        return service.stats(), rounds
+
+    stats, rounds = asyncio.run(run())
+    ok = stats['misses'] == puzzles
+    for round_specs, (_, replies) in zip(rounds_specs, rounds):
+        for index, (status, payload) in enumerate(replies):
+            want = expected[id(round_specs[index // duplicates])]
+            ok = ok and status == 200 and all(payload[field] == want[field] for field in
+                                              ('solution_count', 'solution', 'houses'))
+            ok = ok and sorted(row['constraint'] for row in
+                               payload['stats']['constraints']) == want['labels']
+    requests = puzzles * duplicates
+    result = {
+        'puzzles': puzzles,
+        'requests_per_round': requests,
+        'subprocess_seconds': subprocess_seconds,
+        'cold_seconds': rounds[0][0],
+        'warm_seconds': rounds[1][0],
+        'relabeled_seconds': rounds[2][0],
+        'service': stats,
+        'ok': ok,
+    }
+    print(f"python zebra_puzzle.py per request: {subprocess_seconds * 1000:.1f} ms")
+    print(f"{requests} concurrent requests, {puzzles} distinct puzzles: "
+          f"cold {rounds[0][0] * 1000:.1f} ms ({rounds[0][0] / requests * 1000:.2f} ms each), "
+          f"cached {rounds[1][0] * 1000:.1f} ms ({rounds[1][0] / requests * 1000:.2f} ms each), "
+          f"relabeled copies {rounds[2][0] * 1000:.1f} ms")
+    print(f"solved {stats['misses']}, coalesced {stats['coalesced']}, cache hits {stats['hits']} "
+          f"-> {'OK' if ok else 'FAIL'}")
+    return result
+
+
+def relabeled(spec, rng, mirror=False):
+    """An equivalent spec: values renamed within their categories, everything shuffled.
+
+    With ``mirror`` the clues are also read right to left.
+    """
+    from symmetry import mirror_clue
+    rename = {}
+    categories = {}
+    items = list(spec['categories'].items())
+    rng.shuffle(items)
+    for name, values in items:
+        renamed = rng.sample(values, len(values))
+        rename.update(zip(values, renamed))
+        categories[name] = rng.sample(values, len(values))
+    clues = []
+    for clue in spec['clues']:
+        kind, a, b = clue_args(clue)
+        clue = (kind, rename[a], b if kind == AT_POSITION else rename[b])
+        clues.append(clue_spec(*(mirror_clue(*clue, spec['houses']) if mirror else clue)))
+    rng.shuffle(clues)
+    return normalize_spec({'houses': spec['houses'], 'categories': categories, 'clues': clues})
+
+
+def symmetry_cache(puzzles=10, variants=10, seed=0):
+    """Equivalent puzzle instances answered from ``SymmetryCache`` against solving each.
+
+    Every base puzzle (the stock one plus generated 5 x 5 and 8 x 8 ones)
+    is followed by ``variants`` relabeled and shuffled copies, half of
+    them mirrored. Fails unless each base is solved once, every copy is a
+    cache hit, every mapped-back answer is the copy's own unique solution,
+    and no two bases share a canonical key.
+    """
+    from symmetry import SymmetryCache, canonicalize
+    rng = random.Random(seed)
+    names = {f'c{k}': [f'c{k}v{i}' for i in range(8)] for k in range(8)}
+    bases = [load_spec(STOCK_SPEC)]
+    bases.extend(PuzzleGenerator(seed=seed + i).generate()[0] for i in range(puzzles))
+    bases.extend(PuzzleGenerator(names, seed + i).generate()[0] for i in range(puzzles // 2))
+    specs = []
+    for base in bases:
+        specs.append(base)
+        specs.extend(relabeled(base, rng, mirror=i % 2 == 1) for i in range(variants))
+    expected = [compile_spec(spec, PlanCache()).first_solution() for spec in specs]
+
+    start = time.perf_counter()
+    for spec in specs:
+        compile_spec(spec, PlanCache()).first_and_count(2)
+    direct = time.perf_counter() - start
+
+    cache = SymmetryCache()
+    start = time.perf_counter()
+    answers = [cache.solve(spec) for spec in specs]
+    cached = time.perf_counter() - start
+
+    start = time.perf_counter()
+    keys = {canonicalize(base).key for base in bases}
+    canonical = (time.perf_counter() - start) / len(bases)
+    ok = (cache.misses == len(bases) and len(keys) == len(bases)
+          and all(solution == want and count == 1
+                  for (solution, count, _), want in zip(answers, expected)))
+    result = {
+        'bases': len(bases),
+        'instances': len(specs),
+        'direct_seconds': direct,
+        'cached_seconds': cached,
+        'canonicalize_seconds': canonical,
+        'hits': cache.hits,
+        'misses': cache.misses,
+        'ok': ok,
+    }
+    print(f"{len(specs)} instances of {len(bases)} puzzles: solving each {direct * 1000:.1f} ms, "
+          f"symmetry cache {cached * 1000:.1f} ms (canonical form {canonical * 1000:.2f} ms each)")
+    print(f"solved {cache.misses}, answered from cache {cache.hits} "
+          f"-> {'OK' if ok else 'FAIL'}")
+    return result
+
+
+STAGES = ('build', 'propagate', 'search', 'transform', 'render')
+# A stage regresses when its median is this much slower than the baseline
+# and also slower by more than STAGE_MIN_DELTA seconds, below which
+# differences are timer noise
+STAGE_THRESHOLD = 0.3
+STAGE_MIN_DELTA = 0.0002
+
+
+@functools.lru_cache(maxsize=None)
+def stage_instances(seed=0):
+    """The stock puzzle and generated 6 x 6 and 8 x 8 puzzles, identical on every run."""
+    instances = {'stock': load_spec(STOCK_SPEC)}
+    for size in (6, 8):
+        names = {f'c{k}': [f'c{k}v{i}' for i in range(size)] for k in range(size)}
+        instances[f'generated {size}x{size}'] = PuzzleGenerator(names, seed).generate()[0]
+    return instances
+
+
+def time_stages(spec, stages=STAGES, repeat=5, render_repeat=2):
+    """Median and best seconds of each pipeline stage of ``solve_zebra_puzzle`` on ``spec``.
+
+    build:      normalize and compile the spec with an empty plan cache
+    propagate:  root propagation of the compiled solver
+    search:     first solution and count (capped at 2), untraced
+    transform:  house table and the printed solution text
+    render:     every figure, headless, into a temporary directory
+
+    The render stage draws a traced solve, made outside every timed stage
+    so the search is timed the same whichever stages are selected. As in
+    ``timeit``, the garbage collector is paused while timing, so the
+    objects rendering leaves behind do not slow the other stages down.
+    """
+    from zebra_puzzle import format_solution
+    timings = {stage: [] for stage in stages}
+    render = 'render' in stages
+    if render:
+        from visualization import Visualization
+    collecting = gc.isenabled()
+    with tempfile.TemporaryDirectory() as tmp:
+        for index in range(repeat):
+            gc.collect()
+            gc.disable()
+            marks = [time.perf_counter()]
+            plan = compile_spec(normalize_spec(spec), PlanCache())
+            marks.append(time.perf_counter())
+            plan.solver.root_domains()
+            marks.append(time.perf_counter())
+            solution, count = plan.first_and_count(2, plan.new_stats())
+            marks.append(time.perf_counter())
+            table = HouseTable(solution, spec['categories'], spec['houses'])
+            format_solution(table)
+            marks.append(time.perf_counter())
+            if render and index < render_repeat:
+                stats = plan.new_stats(trace=Trace())
+                plan.first_and_count(2, stats)
+                marks.append(time.perf_counter())
+                visualizer = Visualization(os.path.join(tmp, 'figures'), layout_cache=tmp)
+                visualizer.update_stats(plan.solver.num_constraints, plan.solver.num_variables,
+                                        count, stats)
+                visualizer.update_spec(spec)
+                visualizer.update_trace(stats.trace.as_dict(
+                    plan.solver, [clue_text(clue) for clue in spec['clues']]))
+                visualizer.render_all(table)
+                marks.append(time.perf_counter())
+            if collecting:
+                gc.enable()
+            # The traced solve between transform and render is not a stage
+            spans = list(zip(marks, marks[1:5])) + list(zip(marks[5:], marks[6:]))
+            for stage, (start, end) in zip(STAGES, spans):
+                if stage in timings:
+                    timings[stage].append(end - start)
+    return {stage: {'median': statistics.median(samples), 'best': min(samples)}
+            for stage, samples in timings.items()}
+
+
+def compare_baseline(results, baseline, threshold=STAGE_THRESHOLD):
+    """``(instance, stage, current, baseline)`` rows that regressed beyond ``threshold``."""
+    regressions = []
+    for name, stages in results.items():
+        for stage, timing in stages.items():
+            base = baseline.get('instances', {}).get(name, {}).get(stage)
+            if base is None:
+                continue
+            current = timing['median']
+            if current > base * (1 + threshold) and current - base > STAGE_MIN_DELTA:
+                regressions.append((name, stage, current, base))
+    return regressions
+
+
+def pipeline_stages(stages=STAGES, repeat=5, baseline=None, save_baseline=None,
+                    threshold=STAGE_THRESHOLD):
+    """Time every pipeline stage on the stage instances, optionally against a JSON baseline.
+
+    ``baseline`` is the path of a file written earlier with
+    ``save_baseline``; any stage whose median regressed beyond
+    ``threshold`` fails the run.
+    """
+    instances = stage_instances()
+    before_render = tuple(stage for stage in stages if stage != 'render')
+    results = {name: time_stages(spec, before_render, repeat) if before_render else {}
+               for name, spec in instances.items()}
+    if 'render' in stages:
+        # Rendering leaves the process slower for good (the search runs about
+        # 15% slower afterwards), so it is timed after every other stage
+        for name, spec in instances.items():
+            results[name].update(time_stages(spec, ('render',), 2))
+    reference = {}
+    if baseline is not None:
+        with open(baseline) as f:
+            reference = json.load(f)
+    print(f"{'instance':<16} {'stage':<10} {'median ms':>10} {'best ms':>9} {'baseline':>9}")
+    for name, timings in results.items():
+        for stage, timing in timings.items():
+            base = reference.get('instances', {}).get(name, {}).get(stage)
+            change = '' if base is None else f"{base * 1000:9.3f} {timing['median'] / base - 1:+7.1%}"
+            print(f"{name:<16} {stage:<10} {timing['median'] * 1000:10.3f} "
+                  f"{timing['best'] * 1000:9.3f} {change}")
+    regressions = compare_baseline(results, reference, threshold) if reference else []
+    for name, stage, current, base in regressions:
+        print(f"REGRESSION {name} {stage}: {current * 1000:.3f} ms vs baseline "
+              f"{base * 1000:.3f} ms (threshold {threshold:.0%})")
+    if baseline is not None:
+        print(f"{len(regressions)} regressions against {baseline} "
+              f"-> {'OK' if not regressions else 'FAIL'}")
+    if save_baseline is not None:
+        with open(save_baseline, 'w') as f:
+            json.dump({
+                'version': 1,
+                'python': platform.python_version(),
+                'repeat': repeat,
+                'instances': {name: {stage: timing['median'] for stage, timing in timings.items()}
+                              for name, timings in results.items()},
+            }, f, indent=2)
+        print(f"Wrote baseline to {save_baseline}")
+    return {'instances': results, 'regressions': [list(row) for row in regressions],
+            'ok': not regressions}
+
+
+def profiled(run, directory):
+    """Call ``run()`` under cProfile and tracemalloc and write the reports to ``directory``.
+
+    Writes ``profile.prof`` (for ``pstats`` or snakeviz), ``profile.txt``
+    (the top functions by cumulative time) and ``memory.txt`` (peak traced
+    memory and the lines holding the most memory at the end). Modes that
+    use tracemalloc themselves stop the tracing early; ``memory.txt``
+    then says so.
+    """
+    import cProfile
+    import pstats
+    os.makedirs(directory, exist_ok=True)
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    profiler.enable()
+    try:
+        return run()
+    finally:
+        profiler.disable()
+        profiler.dump_stats(os.path.join(directory, 'profile.prof'))
+        with open(os.path.join(directory, 'profile.txt'), 'w') as f:
+            pstats.Stats(profiler, stream=f).sort_stats('cumulative').print_stats(40)
+        with open(os.path.join(directory, 'memory.txt'), 'w') as f:
+            if tracemalloc.is_tracing():
+                snapshot = tracemalloc.take_snapshot()
+                current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                f.write(f"peak traced memory {peak / 1024:.1f} KiB, "
+                        f"{current / 1024:.1f} KiB still allocated at the end\n\n")
+                for stat in snapshot.statistics('lineno')[:25]:
+                    f.write(f"{stat}\n")
+            else:
+                f.write("tracing was stopped by the benchmark itself; no memory report\n")
+        print(f"Wrote profile.prof, profile.txt and memory.txt to {directory}")
+
+
+# Runs in a fresh interpreter: import the solver and solve the stock puzzle
+# without figures, then report the elapsed time and any plotting modules loaded
+COLD_START_SCRIPT = """
+import contextlib, io, json, sys, time
+start = time.perf_counter()
+import zebra_puzzle
+with contextlib.redirect_stdout(io.StringIO()):
+    zebra_puzzle.solve_zebra_puzzle(render=None)
+elapsed = time.perf_counter() - start
+heavy = [name for name in ('matplotlib', 'networkx', 'numpy') if name in sys.modules]
+print(json.dumps({'seconds': elapsed, 'heavy_modules': heavy}))
+"""
+
+def cold_start(repeat=5, budget_ms=50.0):
+    """Measure import + solve latency of ``solve_zebra_puzzle`` in fresh processes.
+
+    Fails (returns ``ok=False``) when the median exceeds ``budget_ms`` or
+    when solving pulled in any of the plotting dependencies.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, '-c', COLD_START_SCRIPT], cwd=here,
+            capture_output=True, text=True, check=True).stdout
+        wall = time.perf_counter() - start
+        run_result = json.loads(output.strip().splitlines()[-1])
+        run_result['process_seconds'] = wall
+        runs.append(run_result)
+    median = statistics.median(run['seconds'] for run in runs)
+    heavy = sorted({name for run in runs for name in run['heavy_modules']})
+    result = {
+        'median_seconds': median,
+        'median_process_seconds': statistics.median(run['process_seconds'] for run in runs),
+        'budget_seconds': budget_ms / 1000,
+        'heavy_modules': heavy,
+        'ok': median * 1000 <= budget_ms and not heavy,
+    }
+    print(f"import+solve median={median * 1000:.2f} ms "
+          f"(process {result['median_process_seconds'] * 1000:.1f} ms, "
+          f"budget {budget_ms:.0f} ms) heavy modules: {', '.join(heavy) or 'none'} "
+          f"-> {'OK' if result['ok'] else 'FAIL'}")
+    return result
+
+
+# Runs in a fresh interpreter from an empty working directory and records
+# every file opened for writing while the given modules are imported
+IMPORT_WRITES_SCRIPT = """
+import json, os, sys
+WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_APPEND | os.O_CREAT
+writes = []
+def hook(event, args):
+    if event == 'open' and isinstance(args[0], (str, bytes, os.PathLike)):
+        path, mode, flags = args
+        if (mode and any(c in mode for c in 'wax+')) or (flags or 0) & WRITE_FLAGS:
+            writes.append(os.path.abspath(os.fsdecode(path)))
+sys.addaudithook(hook)
+sys.path.insert(0, sys.argv[1])
+for name in sys.argv[2:]:
+    __import__(name)
+print(json.dumps(writes))
+"""
+
+
+def import_writes(modules=('zebra_puzzle', 'solver', 'visualization')):
+    """Files under the project or working directory written by importing ``modules``.
+
+    Importing must be side-effect free, so a non-empty result is a
+    regression. Writes by third-party packages to their own caches (such as
+    matplotlib's font cache) are outside both directories and ignored.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as cwd:
+        output = subprocess.run(
+            [sys.executable, '-B', '-c', IMPORT_WRITES_SCRIPT, here, *modules],
+            cwd=cwd, capture_output=True, text=True, check=True).stdout
+        cwd = os.path.realpath(cwd)
+        roots = (here + os.sep, cwd + os.sep)
+        writes = [path for path in json.loads(output.strip().splitlines()[-1])
+                  if os.path.realpath(path).startswith(roots)]
+    print(f"import {', '.join(modules)}: {len(writes)} file writes"
+          f" -> {'OK' if not writes else 'FAIL'}")
+    for path in writes:
+        print(f"  wrote {path}")
+    return writes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--houses', type=int, nargs='+', default=[5, 6, 8, 10, 12])
+    parser.add_argument('--categories', type=int, nargs='+', default=[5, 6, 8])
+    parser.add_argument('--seeds', type=int, default=3,
+                        help="random puzzles per size (default: 3)")
+    parser.add_argument('--clues-per-value', type=float, default=1.5)
+    parser.add_argument('--no-propagation', dest='propagation', action='store_false',
+                        help="search with forward checking only")
+    parser.add_argument('--compare-orderings', action='store_true',
+                        help="compare variable/value ordering strategies instead")
+    parser.add_argument('--cold-start', action='store_true',
+                        help="measure import + solve latency in fresh processes instead")
+    parser.add_argument('--budget-ms', type=float, default=50.0,
+                        help="cold-start budget in milliseconds (default: 50)")
+    parser.add_argument('--import-writes', action='store_true',
+                        help="check that importing the modules writes no files")
+    parser.add_argument('--transform', action='store_true',
+                        help="time the solution-to-house-table transform instead")
+    parser.add_argument('--generate', action='store_true',
+                        help="time the incremental puzzle generator instead")
+    parser.add_argument('--session', action='store_true',
+                        help="time clue edits on an incremental solver session instead")
+    parser.add_argument('--engines', action='store_true',
+                        help="compare the bitmask and SAT backends instead")
+    parser.add_argument('--trace', action='store_true',
+                        help="measure the cost of recording a solver trace instead")
+    parser.add_argument('--layout', action='store_true',
+                        help="time the constraint-graph layout with and without its cache")
+    parser.add_argument('--render-batch', action='store_true',
+                        help="render many solutions into one PDF and check memory stays flat")
+    parser.add_argument('--puzzles', type=int, default=10000,
+                        help="solutions rendered by --render-batch (default: 10000)")
+    parser.add_argument('--serve', action='store_true',
+                        help="time the HTTP solve service against one process per request")
+    parser.add_argument('--symmetry', action='store_true',
+                        help="answer relabeled and mirrored copies of puzzles from the symmetry cache")
+    parser.add_argument('--stages', action='store_true',
+                        help="time each pipeline stage on the stock and generated puzzles")
+    parser.add_argument('--stage', dest='stage_names', action='append', choices=STAGES,
+                        help="stage timed by --stages, repeatable (default: all)")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="runs per stage for --stages (default: 5)")
+    parser.add_argument('--baseline', metavar='PATH',
+                        help="fail --stages when a stage regressed against this baseline")
+    parser.add_argument('--save-baseline', metavar='PATH',
+                        help="write the --stages medians as a new baseline")
+    parser.add_argument('--threshold', type=float, default=STAGE_THRESHOLD,
+                        help="allowed slowdown against the baseline (default: 0.3)")
+    parser.add_argument('--profile', metavar='DIR',
+                        help="run under cProfile and tracemalloc and write the reports to DIR")
+    parser.add_argument('--json', metavar='PATH', help="write the results as JSON")
+    args = parser.parse_args(argv)
+
+    if args.profile:
+        if args.stages:
+            # Generating the instances is not part of the pipeline
+            stage_instances()
+        results, failed = profiled(lambda: run_mode(args), args.profile)
+    else:
+        results, failed = run_mode(args)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if failed:
+        sys.exit(1)
+    return results
+
+
+def run_mode(args):
+    """Run the benchmark ``args`` select; returns ``(results, failed)``."""
+    failed = False
+    if args.stages:
+        # Profiling slows every stage down; comparing against a baseline
+        # would only report the profiler's overhead
+        baseline = None if args.profile else args.baseline
+        if args.profile and args.baseline:
+            print("Not comparing against the baseline while profiling")
+        results = pipeline_stages(tuple(args.stage_names or STAGES), args.repeat, baseline,
+                                  args.save_baseline, args.threshold)
+        failed = not results['ok']
+    elif args.symmetry:
+        results = symmetry_cache()
+        failed = not results['ok']
+    elif args.serve:
+        results = serve_requests()
+        failed = not results['ok']
+    elif args.render_batch:
+        results = batch_rendering(args.puzzles)
+        failed = not results['ok']
+    elif args.layout:
+        results = layout_cache()
+        failed = not results['ok']
+    elif args.trace:
+        results = trace_overhead()
+        failed = not results['ok']
+    elif args.engines:
+        results = engine_crossover()
+        failed = not results['ok']
+    elif args.session:
+        results = session_edits()
+        failed = not results['ok']
+    elif args.generate:
+        results = generate_puzzles()
+        failed = not results['ok']
+    elif args.transform:
+        results = transform_scaling()
+    elif args.import_writes:
+        results = import_writes()
+        failed = bool(results)
+    elif args.cold_start:
+        results = cold_start(budget_ms=args.budget_ms)
+        failed = not results['ok']
+    elif args.compare_orderings:
+        specs = ordering_specs(args.houses, args.categories, args.seeds, args.clues_per_value)
+        results = compare_orderings(specs, propagation=args.propagation)
+    else:
+        results = run(args.houses, args.categories, args.seeds, args.clues_per_value,
+                      args.propagation)
+    return results, failed
+
+if __name__ == '__main__':
+    main()
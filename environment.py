@@ -0,0 +1,45 @@
+"""Startup check that the pinned dependencies are installed.
+
+``check_environment()`` reads ``requirements.txt`` once, compares every
+``name==version`` pin with the installed distribution and caches the
+result, so calling it on every start-up (or every render) costs one file
+read per process and never writes anything.
+"""
+
+import functools
+import os
+from importlib import metadata
+
+REQUIREMENTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'requirements.txt')
+
+
+def read_requirements(path=REQUIREMENTS):
+    """Return ``{name: pinned_version_or_None}`` from a requirements file."""
+    pins = {}
+    with open(path) as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            name, _, version = line.partition('==')
+            pins[name.strip()] = version.strip() or None
+    return pins
+
+
+@functools.lru_cache(maxsize=None)
+def check_environment(path=REQUIREMENTS):
+    """Return a tuple of human readable problems; empty when all is well.
+
+    Missing packages and version mismatches are both reported. The result
+    is cached per requirements file for the life of the process.
+    """
+    problems = []
+    for name, pinned in read_requirements(path).items():
+        try:
+            installed = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            problems.append(f"{name} is not installed (requirements.txt pins {pinned or 'any version'})")
+            continue
+        if pinned is not None and installed != pinned:
+            problems.append(f"{name} {installed} is installed but requirements.txt pins {pinned}")
+    return tuple(problems)
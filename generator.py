@@ -0,0 +1,160 @@
+"""Generate new Zebra-style puzzles with a unique solution.
+
+``PuzzleGenerator`` picks a random target assignment, then adds clues that
+hold for the target until it is the only solution, and finally drops every
+clue that turns out not to be needed.
+
+Uniqueness checks are incremental instead of re-solving from scratch:
+
+- one solver is kept for the whole build-up, and ``add_clue`` folds each
+  new clue into its cached, already propagated root domains;
+- the last non-target solution found (the *witness*) is kept, and only
+  clues the witness violates are added, so every clue makes progress;
+- when minimizing, a clue whose removal would let a known witness back
+  in is kept without searching at all.
+
+Run ``python generator.py --count 3`` to print a few generated specs.
+"""
+
+import random
+
+from puzzle_spec import PlanCache, clue_spec, load_spec, STOCK_SPEC
+from solver import CLUE_KINDS, SAME_HOUSE, NEXT_TO, RIGHT_OF, AT_POSITION, clue_holds
+
+
+def random_assignment(categories, rng):
+    """A random ``{value: house}`` solution with one value per house per category."""
+    target = {}
+    for values in categories.values():
+        houses = list(range(1, len(values) + 1))
+        rng.shuffle(houses)
+        target.update(zip(values, houses))
+    return target
+
+
+def candidate_clues(target, categories, houses, kinds=CLUE_KINDS):
+    """Every ``(kind, a, b)`` clue of the given kinds that ``target`` satisfies."""
+    values = [value for members in categories.values() for value in members]
+    category_of = {value: name for name, members in categories.items() for value in members}
+    clues = []
+    if AT_POSITION in kinds:
+        clues.extend((AT_POSITION, value, target[value]) for value in values)
+    for i, a in enumerate(values):
+        for b in values[i + 1:]:
+            distance = target[a] - target[b]
+            if distance == 0 and SAME_HOUSE in kinds and category_of[a] != category_of[b]:
+                clues.append((SAME_HOUSE, a, b))
+            elif abs(distance) == 1:
+                if NEXT_TO in kinds:
+                    clues.append((NEXT_TO, a, b))
+                if RIGHT_OF in kinds:
+                    clues.append((RIGHT_OF, a, b) if distance == 1 else (RIGHT_OF, b, a))
+    return clues
+
+
+class PuzzleGenerator:
+    """Builds uniquely solvable puzzles over a fixed set of categories.
+
+    ``categories`` defaults to the stock puzzle's; ``kinds`` restricts the
+    clue types used. ``counters`` accumulates, over every ``generate()``
+    call, the uniqueness checks made, how many of them needed a search,
+    and the search nodes those searches expanded.
+    """
+
+    def __init__(self, categories=None, seed=None, kinds=CLUE_KINDS, **ordering):
+        if categories is None:
+            categories = load_spec(STOCK_SPEC)['categories']
+        self.categories = {name: list(values) for name, values in categories.items()}
+        self.houses = len(next(iter(self.categories.values()), ()))
+        self.kinds = tuple(kinds)
+        self.ordering = ordering
+        self.rng = random.Random(seed)
+        self._layout = PlanCache(maxsize=1).layout(
+            {'houses': self.houses, 'categories': self.categories})
+        self.counters = {'checks': 0, 'searches': 0, 'nodes': 0}
+
+    def generate(self, minimize=True):
+        """Return ``(spec, target)`` for a new puzzle whose only solution is ``target``."""
+        target = random_assignment(self.categories, self.rng)
+        pool = candidate_clues(target, self.categories, self.houses, self.kinds)
+        self.rng.shuffle(pool)
+        solver = self._solver(())
+        clues = []
+        witnesses = []
+        witness = self._other_solution(solver, target)
+        while witness is not None:
+            witnesses.append(witness)
+            # A clue the witness satisfies cannot rule it out; skip those
+            for i in range(len(pool) - 1, -1, -1):
+                if not clue_holds(*pool[i], witness):
+                    break
+            else:
+                raise ValueError(f"clue kinds {self.kinds} cannot make this puzzle unique")
+            clue = pool.pop(i)
+            solver.add_clue(*clue)
+            clues.append(clue)
+            witness = self._other_solution(solver, target)
+        if minimize:
+            clues = self._minimize(clues, target, witnesses)
+        spec = {
+            'houses': self.houses,
+            'categories': {name: list(values) for name, values in self.categories.items()},
+            'clues': [clue_spec(*clue) for clue in clues],
+        }
+        return spec, target
+
+    def _minimize(self, clues, target, witnesses):
+        """Drop clues that are not needed for uniqueness, last added first."""
+        kept = list(clues)
+        for clue in reversed(clues):
+            trial = [other for other in kept if other != clue]
+            if any(all(clue_holds(*other, witness) for other in trial) for witness in witnesses):
+                self.counters['checks'] += 1
+                continue
+            witness = self._other_solution(self._solver(trial), target)
+            if witness is None:
+                kept = trial
+            else:
+                witnesses.append(witness)
+        return kept
+
+    def _solver(self, clues):
+        solver = self._layout.copy()
+        # Prime the root so each add_clue narrows it incrementally
+        solver.root_domains()
+        for clue in clues:
+            solver.add_clue(*clue)
+        return solver
+
+    def _other_solution(self, solver, target):
+        """A solution other than ``target``, or None when ``target`` is unique."""
+        self.counters['checks'] += 1
+        self.counters['searches'] += 1
+        stats = solver.new_stats()
+        solutions = solver.iter_solutions(stats, **self.ordering)
+        try:
+            for solution in solutions:
+                if solution != target:
+                    return solution
+            return None
+        finally:
+            solutions.close()
+            self.counters['nodes'] += stats.nodes
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description="Generate uniquely solvable Zebra-style puzzles")
+    parser.add_argument('--spec', default=STOCK_SPEC,
+                        help="spec whose categories the puzzles use (default: the stock puzzle)")
+    parser.add_argument('--count', type=int, default=1, help="number of puzzles (default: 1)")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--kind', dest='kinds', action='append', choices=CLUE_KINDS,
+                        help="clue kind to use, repeatable (default: all)")
+    args = parser.parse_args()
+    generator = PuzzleGenerator(load_spec(args.spec)['categories'], args.seed,
+                                tuple(args.kinds or CLUE_KINDS))
+    for _ in range(args.count):
+        spec, _target = generator.generate()
+        print(json.dumps(spec, indent=2))
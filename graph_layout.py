@@ -0,0 +1,121 @@
+"""Constraint graph of a puzzle spec and its disk-cached layout.
+
+``constraint_graph`` builds the graph from the spec's own clues: one node
+per value (tagged with its category, and with its house when an
+``at_position`` clue fixes it) and one edge per binary clue. Nothing is
+hard-coded, so every puzzle gets its own graph.
+
+``cached_layout`` runs ``networkx.spring_layout`` with a fixed seed on each
+connected component and packs the components in rows, so the same graph
+always gets the same picture, and stores the positions as JSON
+under a hash of the graph structure. Rendering the same puzzle again, in
+this process or a later one, reads the file instead of running the
+layout. The cache is best effort: unreadable or unwritable files just mean
+the layout is computed.
+"""
+
+import hashlib
+import json
+import os
+
+import networkx as nx
+
+from puzzle_spec import clue_args
+from solver import AT_POSITION
+
+LAYOUT_SEED = 7
+# Bump when the layout algorithm or its parameters change
+LAYOUT_VERSION = 1
+LAYOUT_CACHE = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'zebra-puzzle', 'layouts')
+
+
+def constraint_graph(spec):
+    """``networkx.DiGraph`` of the values and binary clues of ``spec``.
+
+    Edges run from clue value ``a`` to ``b`` and carry the clue ``kinds``
+    relating them; fixed houses are the node attribute ``house``.
+    """
+    graph = nx.DiGraph()
+    for category, values in spec['categories'].items():
+        for value in values:
+            graph.add_node(value, category=category, house=None)
+    for clue in spec['clues']:
+        kind, a, b = clue_args(clue)
+        if kind == AT_POSITION:
+            graph.nodes[a]['house'] = b
+        elif graph.has_edge(a, b):
+            graph.edges[a, b]['kinds'].append(kind)
+        else:
+            graph.add_edge(a, b, kinds=[kind])
+    return graph
+
+
+def layout_key(graph):
+    """Hash of everything the layout depends on: nodes in order and edges."""
+    payload = [LAYOUT_VERSION, LAYOUT_SEED, list(graph.nodes), sorted(graph.edges)]
+    encoded = json.dumps(payload, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def _component_layout(graph):
+    """Seeded spring layout per connected component, packed in rows.
+
+    Puzzle graphs fall apart into many small components; laying each out
+    on its own and packing them keeps pairs at a readable distance instead
+    of letting unrelated components drift on top of each other.
+    """
+    order = {node: i for i, node in enumerate(graph.nodes)}
+    components = sorted(nx.connected_components(graph.to_undirected()),
+                        key=lambda nodes: (-len(nodes), min(order[node] for node in nodes)))
+    # Each component gets a square cell growing with its size, plus a gap;
+    # rows are about as wide as the packing is tall
+    radii = [0.5 * len(nodes) ** 0.5 + 0.3 for nodes in components]
+    row_width = max(sum((2 * radius) ** 2 for radius in radii) ** 0.5, 2 * radii[0]) if radii else 0
+    layout = {}
+    x = y = row_height = 0.0
+    for nodes, radius in zip(components, radii):
+        if x > 0 and x + 2 * radius > row_width:
+            x = 0.0
+            y -= row_height
+            row_height = 0.0
+        center = (x + radius, y - radius)
+        nodes = sorted(nodes, key=order.get)
+        if len(nodes) == 1:
+            positions = {nodes[0]: (0.0, 0.0)}
+        else:
+            positions = nx.spring_layout(graph.subgraph(nodes), seed=LAYOUT_SEED,
+                                         scale=radius - 0.6)
+        for node in nodes:
+            px, py = positions[node]
+            layout[node] = (float(center[0] + px), float(center[1] + py))
+        x += 2 * radius
+        row_height = max(row_height, 2 * radius)
+    return layout
+
+
+def cached_layout(graph, cache_dir=LAYOUT_CACHE):
+    """``{node: (x, y)}`` for ``graph``, from ``cache_dir`` when already computed.
+
+    ``cache_dir=None`` disables the cache.
+    """
+    path = None
+    if cache_dir is not None:
+        path = os.path.join(cache_dir, f'{layout_key(graph)}.json')
+        try:
+            with open(path) as f:
+                return {node: tuple(xy) for node, xy in json.load(f).items()}
+        except (OSError, ValueError):
+            pass
+    layout = _component_layout(graph)
+    if path is not None:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = f'{path}.{os.getpid()}.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(layout, f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+    return layout
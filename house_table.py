@@ -0,0 +1,69 @@
+"""Inverted index from (category, house) to value for one solution.
+
+Solvers return ``{value: house}``; printing and drawing need the opposite
+direction. ``HouseTable`` builds it in a single pass over the values, after
+which every lookup is O(1).
+"""
+
+from collections.abc import Mapping
+
+
+class HouseTable(Mapping):
+    """Read-only ``{category: [value in house 1, value in house 2, ...]}``.
+
+    Behaves like the ``solution_data`` dict of lists the visualizer has
+    always consumed, and adds O(1) ``value(category, house)``,
+    ``house_row(house)`` and ``house_of(value)`` lookups.
+    """
+
+    __slots__ = ('houses', '_rows', '_house_of')
+
+    def __init__(self, solution, categories, houses=None):
+        if houses is None:
+            houses = len(next(iter(categories.values()), ()))
+        self.houses = houses
+        self._house_of = solution
+        self._rows = {}
+        for category, values in categories.items():
+            row = [None] * houses
+            for value in values:
+                row[solution[value] - 1] = value
+            self._rows[category] = row
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from an existing ``{category: [value by house]}`` mapping."""
+        if isinstance(rows, cls):
+            return rows
+        solution = {}
+        for values in rows.values():
+            for house, value in enumerate(values, 1):
+                solution[value] = house
+        return cls(solution, rows, len(next(iter(rows.values()), ())))
+
+    def __getitem__(self, category):
+        return self._rows[category]
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __reduce__(self):
+        return HouseTable, (self._house_of, dict(self._rows), self.houses)
+
+    def value(self, category, house):
+        """The value of ``category`` in 1-based ``house``."""
+        return self._rows[category][house - 1]
+
+    def house_row(self, house):
+        """``{category: value}`` for 1-based ``house``."""
+        return {category: row[house - 1] for category, row in self._rows.items()}
+
+    def house_of(self, value):
+        """1-based house holding ``value``, or None if no category has it."""
+        return self._house_of.get(value)
+
+    def as_dict(self):
+        return {category: list(row) for category, row in self._rows.items()}
@@ -0,0 +1,100 @@
+"""Variable- and value-ordering heuristics for ``BitmaskSolver``.
+
+A variable ordering is ``select(solver, domains, assigned)`` returning the
+index of the next value to branch on, or None once every value is decided.
+``assigned`` is a bitmask of the values already branched on; with
+propagation enabled, values narrowed to a single house count as decided.
+
+A value ordering is ``order(solver, domains, var)`` returning the houses
+(0-based) to try for ``var``, in order.
+
+Both registries are plain dicts, so new strategies can be plugged in by
+adding an entry.
+"""
+
+
+def _open(solver, domains, assigned, var):
+    if assigned >> var & 1:
+        return False
+    if solver.propagation:
+        mask = domains[var]
+        return bool(mask & (mask - 1))
+    return True
+
+
+def input_order(solver, domains, assigned):
+    """The order in which values were registered (categories in turn)."""
+    # Skip straight to the lowest value not yet branched on
+    start = (~assigned & (assigned + 1)).bit_length() - 1
+    for var in range(start, len(domains)):
+        if _open(solver, domains, assigned, var):
+            return var
+    return None
+
+
+def minimum_remaining_values(solver, domains, assigned):
+    """The open value with the fewest houses left (first fail)."""
+    best = None
+    best_size = None
+    for var in range(len(domains)):
+        if _open(solver, domains, assigned, var):
+            size = domains[var].bit_count()
+            if best is None or size < best_size:
+                best, best_size = var, size
+                if size <= 2:
+                    break
+    return best
+
+
+def mrv_degree(solver, domains, assigned):
+    """MRV, ties broken by the number of clues touching the value."""
+    degree = solver.degrees()
+    best = None
+    best_key = None
+    for var in range(len(domains)):
+        if _open(solver, domains, assigned, var):
+            key = (domains[var].bit_count(), -degree[var])
+            if best is None or key < best_key:
+                best, best_key = var, key
+    return best
+
+
+def ascending_values(solver, domains, var):
+    """Houses from left to right."""
+    mask = domains[var]
+    houses = []
+    while mask:
+        bit = mask & -mask
+        mask ^= bit
+        houses.append(bit.bit_length() - 1)
+    return houses
+
+
+def least_constraining_value(solver, domains, var):
+    """Houses that remove the fewest options from other values first."""
+    peers = solver.categories[solver.category_of[var]]
+    relations = solver.relations[var]
+    scored = []
+    for house in ascending_values(solver, domains, var):
+        bit = 1 << house
+        removed = 0
+        for peer in peers:
+            if peer != var and domains[peer] & bit:
+                removed += 1
+        for other, table, _ in relations:
+            removed += (domains[other] & ~table[house]).bit_count()
+        scored.append((removed, house))
+    scored.sort()
+    return [house for _, house in scored]
+
+
+VARIABLE_ORDERINGS = {
+    'input': input_order,
+    'mrv': minimum_remaining_values,
+    'mrv_degree': mrv_degree,
+}
+
+VALUE_ORDERINGS = {
+    'ascending': ascending_values,
+    'lcv': least_constraining_value,
+}
@@ -0,0 +1,175 @@
+"""Constraint propagation over bitmask domains.
+
+Two filters are run to a common fixpoint:
+
+* AC-3 over the binary clue relations: every house left in a value's
+  domain must be supported by some house of each related value.
+* Matching-based all-different filtering (Regin's algorithm) for every
+  category: a house stays in a domain only if some perfect matching of the
+  category's values to houses uses it.
+
+Both work on the structures compiled by ``solver.BitmaskSolver``: a list of
+domain masks, per-value ``(other, table)`` relations and category members.
+"""
+
+import math
+
+from search_stats import clock
+from solve_trace import NARROW
+
+
+def support(mask, table):
+    """Union of ``table[h]`` over every house ``h`` in ``mask``."""
+    allowed = 0
+    while mask:
+        bit = mask & -mask
+        mask ^= bit
+        allowed |= table[bit.bit_length() - 1]
+    return allowed
+
+
+def propagate(solver, domains, changed, stats=None):
+    """Narrow ``domains`` in place to the AC-3 + all-different fixpoint.
+
+    ``changed`` lists the values whose domains changed since the last
+    fixpoint. Returns False as soon as a domain is wiped out. Per-constraint
+    calls, rejections and time are added to ``stats`` when given, and every
+    narrowing to its ``trace`` if it has one.
+    """
+    if stats is None:
+        stats = solver.new_stats()
+    trace = stats.trace
+    clue_calls = stats.clue_calls
+    clue_ns = stats.clue_ns
+    relations = solver.relations
+    category_of = solver.category_of
+    queue = list(changed)
+    queued = set(queue)
+    dirty = {category_of[var] for var in queue}
+    while queue:
+        while queue:
+            var = queue.pop()
+            queued.discard(var)
+            mask = domains[var]
+            for other, table, clue in relations[var]:
+                started = clock()
+                current = domains[other]
+                narrowed = current & support(mask, table)
+                clue_calls[clue] += 1
+                clue_ns[clue] += clock() - started
+                if narrowed != current:
+                    if trace is not None:
+                        trace.record((NARROW, clue, other, current, narrowed))
+                    if not narrowed:
+                        stats.clue_rejections[clue] += 1
+                        return False
+                    domains[other] = narrowed
+                    dirty.add(category_of[other])
+                    if other not in queued:
+                        queued.add(other)
+                        queue.append(other)
+        for category in dirty:
+            members = solver.categories[category]
+            started = clock()
+            narrowed = alldiff_filter([domains[var] for var in members])
+            stats.alldiff_calls[category] += 1
+            stats.alldiff_ns[category] += clock() - started
+            if narrowed is None:
+                stats.alldiff_rejections[category] += 1
+                return False
+            for var, mask in zip(members, narrowed):
+                if mask != domains[var]:
+                    if trace is not None:
+                        trace.record((NARROW, ~category, var, domains[var], mask))
+                    domains[var] = mask
+                    if var not in queued:
+                        queued.add(var)
+                        queue.append(var)
+        dirty = set()
+    return True
+
+
+def _augment(i, domains, owner, match, seen):
+    """Kuhn's augmenting path search from value ``i``; updates ``seen``."""
+    mask = domains[i] & ~seen[0]
+    while mask:
+        bit = mask & -mask
+        mask ^= bit
+        if seen[0] & bit:
+            continue
+        seen[0] |= bit
+        j = owner.get(bit)
+        if j is None or _augment(j, domains, owner, match, seen):
+            owner[bit] = i
+            match[i] = bit
+            return True
+    return False
+
+
+def alldiff_filter(domains):
+    """Filter the domains of one category; None when no matching exists.
+
+    With as many values as houses every house is matched, so a house ``h``
+    is consistent for value ``i`` exactly when ``i`` and the value matched
+    to ``h`` lie in the same strongly connected component of the
+    alternating graph.
+    """
+    n = len(domains)
+    owner = {}
+    match = [0] * n
+    for i in range(n):
+        if not _augment(i, domains, owner, match, [0]):
+            return None
+
+    # i -> j when i could take the house currently matched to j
+    reach = []
+    for i in range(n):
+        edges = 1 << i
+        mask = domains[i]
+        while mask:
+            bit = mask & -mask
+            mask ^= bit
+            edges |= 1 << owner[bit]
+        reach.append(edges)
+    # Transitive closure (Warshall) over at most one bit per value
+    for k in range(n):
+        through = reach[k]
+        flag = 1 << k
+        for i in range(n):
+            if reach[i] & flag:
+                reach[i] |= through
+
+    narrowed = []
+    for i in range(n):
+        allowed = 0
+        flag = 1 << i
+        component = reach[i]
+        while component:
+            bit = component & -component
+            component ^= bit
+            j = bit.bit_length() - 1
+            if reach[j] & flag:
+                allowed |= match[j]
+        narrowed.append(domains[i] & allowed)
+    return narrowed
+
+
+def search_space(domains):
+    """log10 of the product of domain sizes (the naive search tree size)."""
+    return sum(math.log10(mask.bit_count()) for mask in domains if mask)
+
+
+def propagation_report(solver):
+    """Describe how much root propagation shrinks the search tree."""
+    before = list(solver.domains)
+    after = list(before)
+    consistent = all(before) and propagate(solver, after, range(len(after)))
+    return {
+        'consistent': bool(consistent),
+        'domain_values_before': sum(mask.bit_count() for mask in before),
+        'domain_values_after': sum(mask.bit_count() for mask in after) if consistent else 0,
+        'fixed_before': sum(1 for mask in before if mask.bit_count() == 1),
+        'fixed_after': sum(1 for mask in after if mask.bit_count() == 1) if consistent else 0,
+        'log10_space_before': search_space(before),
+        'log10_space_after': search_space(after) if consistent else 0.0,
+    }
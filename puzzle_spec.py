@@ -0,0 +1,287 @@
+"""Declarative puzzle specs and the compiled solve-plan cache.
+
+A spec is a JSON or TOML document listing the house count, the categories
+and their values, and typed clues::
+
+    {
+      "houses": 5,
+      "categories": {"nationality": ["Englishman", ...], ...},
+      "clues": [
+        {"type": "same_house", "a": "Englishman", "b": "red"},
+        {"type": "next_to", "a": "Norwegian", "b": "blue"},
+        {"type": "right_of", "a": "green", "b": "ivory"},
+        {"type": "at_position", "a": "milk", "house": 3}
+      ]
+    }
+
+``compile_spec`` turns a spec into a ``SolvePlan`` keyed by a content hash
+of everything that affects solving, so re-solving the same puzzle reuses
+the compiled solver and a variant that only changes clues reuses the
+compiled category layout.
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from sat import SatEngine, choose_engine
+from solver import BitmaskSolver, CLUE_KINDS, AT_POSITION
+
+PUZZLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'puzzles')
+STOCK_SPEC = os.path.join(PUZZLE_DIR, 'zebra.json')
+ENGINES = ('auto', 'bitmask', 'sat')
+
+
+def load_spec(path):
+    """Read a puzzle spec from a ``.json`` or ``.toml`` file."""
+    if path.endswith('.toml'):
+        import tomllib
+        with open(path, 'rb') as f:
+            return normalize_spec(tomllib.load(f))
+    with open(path) as f:
+        return normalize_spec(json.load(f))
+
+
+def normalize_spec(spec):
+    """Validate a spec mapping and return it in canonical field layout."""
+    try:
+        categories = spec['categories']
+        clues = spec.get('clues', [])
+    except (KeyError, TypeError):
+        raise ValueError("a puzzle spec needs a 'categories' mapping") from None
+    if not isinstance(categories, Mapping):
+        raise ValueError("a puzzle spec needs a 'categories' mapping")
+    for name, values in categories.items():
+        if (not isinstance(values, (list, tuple))
+                or not all(isinstance(value, str) for value in values)):
+            raise ValueError(f"category {name!r} must be a list of value names")
+    categories = {name: list(values) for name, values in categories.items()}
+    houses = spec.get('houses')
+    if houses is None:
+        houses = len(next(iter(categories.values()), []))
+    if not isinstance(houses, int) or isinstance(houses, bool) or houses < 1:
+        raise ValueError(f"'houses' must be a positive integer, got {houses!r}")
+    for name, values in categories.items():
+        if len(values) != houses:
+            raise ValueError(
+                f"category {name!r} has {len(values)} values but the puzzle has {houses} houses")
+    if not isinstance(clues, (list, tuple)):
+        raise ValueError("'clues' must be a list")
+    known = {value for values in categories.values() for value in values}
+    normalized = []
+    for number, clue in enumerate(clues, 1):
+        if not isinstance(clue, Mapping):
+            raise ValueError(f"clue {number} must be a mapping, got {clue!r}")
+        kind = clue.get('type')
+        if kind not in CLUE_KINDS:
+            raise ValueError(f"unknown clue type {kind!r}")
+        fields = ('a', 'house') if kind == AT_POSITION else ('a', 'b')
+        missing = [field for field in fields if field not in clue]
+        if missing:
+            raise ValueError(f"{kind} clue {number} is missing {', '.join(map(repr, missing))}")
+        for field in ('a',) if kind == AT_POSITION else ('a', 'b'):
+            if not isinstance(clue[field], str) or clue[field] not in known:
+                raise ValueError(f"clue {number} names unknown value {clue[field]!r}")
+        entry = {'type': kind, 'a': clue['a']}
+        if kind == AT_POSITION:
+            try:
+                house = int(clue['house'])
+            except (TypeError, ValueError):
+                house = None
+            if house is None or not 1 <= house <= houses:
+                raise ValueError(f"clue {number} has house {clue['house']!r}, "
+                                 f"expected 1 to {houses}")
+            entry['house'] = house
+        else:
+            entry['b'] = clue['b']
+        if 'text' in clue:
+            entry['text'] = clue['text']
+        normalized.append(entry)
+    result = {'houses': houses, 'categories': categories, 'clues': normalized}
+    if 'name' in spec:
+        result['name'] = spec['name']
+    return result
+
+
+def clue_args(clue):
+    """Return the ``(kind, a, b)`` triple a spec clue compiles to."""
+    if clue['type'] == AT_POSITION:
+        return clue['type'], clue['a'], clue['house']
+    return clue['type'], clue['a'], clue['b']
+
+
+def clue_spec(kind, a, b):
+    """Inverse of ``clue_args``: the spec entry for clue ``(kind, a, b)``."""
+    if kind == AT_POSITION:
+        return {'type': kind, 'a': a, 'house': b}
+    return {'type': kind, 'a': a, 'b': b}
+
+
+def clue_text(clue):
+    """The clue's own wording, or a generic ``kind(a, b)`` label."""
+    if 'text' in clue:
+        return clue['text']
+    kind, a, b = clue_args(clue)
+    return f'{kind}({a}, {b})'
+
+
+def category_label(category):
+    """Human readable heading for a category key."""
+    return category.replace('_', ' ').capitalize()
+
+
+def _digest(payload):
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def layout_hash(spec):
+    """Hash of the house count and categories alone."""
+    return _digest([spec['houses'], list(spec['categories'].items())])
+
+
+def spec_hash(spec):
+    """Content hash of a spec; names and clue texts do not contribute."""
+    return _digest([
+        spec['houses'],
+        list(spec['categories'].items()),
+        [clue_args(clue) for clue in spec['clues']],
+    ])
+
+
+class SolvePlan:
+    """A compiled puzzle that can be solved any number of times.
+
+    Every solving mode takes an ``engine``: ``'bitmask'`` for the native
+    backtracking search, ``'sat'`` for the CNF encoding (see ``sat``) or
+    ``'auto'`` (the default) to let ``sat.choose_engine`` pick by size.
+    ``ordering`` keywords only affect the bitmask search.
+    """
+
+    def __init__(self, spec, key, solver):
+        self.spec = spec
+        self.key = key
+        self.solver = solver
+        self._sat = None
+
+    @property
+    def houses(self):
+        return self.spec['houses']
+
+    @property
+    def categories(self):
+        return self.spec['categories']
+
+    def engine(self, name='auto'):
+        """The backend object behind ``engine=name``."""
+        if name == 'auto':
+            name = choose_engine(self.solver)
+        if name == 'bitmask':
+            return self.solver
+        if name == 'sat':
+            if self._sat is None:
+                self._sat = SatEngine(self.solver)
+            return self._sat
+        raise ValueError(f"unknown engine {name!r}, expected one of {ENGINES}")
+
+    def solve(self, engine='auto'):
+        return self.engine(engine).get_solutions()
+
+    def iter_solutions(self, stats=None, engine='auto', **ordering):
+        return self.engine(engine).iter_solutions(stats, **ordering)
+
+    def iter_houses(self, stats=None, engine='auto', **ordering):
+        return self.engine(engine).iter_houses(stats, **ordering)
+
+    def first_solution(self, stats=None, engine='auto', **ordering):
+        return self.engine(engine).first_solution(stats, **ordering)
+
+    def count_solutions(self, limit=None, stats=None, engine='auto', **ordering):
+        return self.engine(engine).count_solutions(limit, stats, **ordering)
+
+    def first_and_count(self, limit=None, stats=None, engine='auto', **ordering):
+        return self.engine(engine).first_and_count(limit, stats, **ordering)
+
+    def is_unique(self, stats=None, engine='auto', **ordering):
+        return self.engine(engine).is_unique(stats, **ordering)
+
+    def new_stats(self, trace=None):
+        return self.solver.new_stats(trace)
+
+
+class PlanCache:
+    """Least-recently-used cache of compiled plans and category layouts."""
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._plans = OrderedDict()
+        self._layouts = OrderedDict()
+
+    def __len__(self):
+        return len(self._plans)
+
+    def clear(self):
+        self._plans.clear()
+        self._layouts.clear()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        plan = self._plans.get(key)
+        if plan is None:
+            self.misses += 1
+            return None
+        self._plans.move_to_end(key)
+        self.hits += 1
+        return plan
+
+    def put(self, plan):
+        self._store(self._plans, plan.key, plan)
+
+    def layout(self, spec):
+        """Return a solver with only the spec's categories registered."""
+        key = layout_hash(spec)
+        base = self._layouts.get(key)
+        if base is None:
+            base = BitmaskSolver(spec['houses'])
+            for name, values in spec['categories'].items():
+                base.add_category(values, name)
+            self._store(self._layouts, key, base)
+        else:
+            self._layouts.move_to_end(key)
+        return base
+
+    def _store(self, entries, key, value):
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.maxsize:
+            entries.popitem(last=False)
+
+
+_default_cache = PlanCache()
+
+
+def compile_layout(spec, cache=None):
+    """Return the cached solver holding only the spec's categories (do not edit it)."""
+    if cache is None:
+        cache = _default_cache
+    return cache.layout(spec)
+
+
+def compile_spec(spec, cache=None):
+    """Compile a (normalized) spec into a cached ``SolvePlan``."""
+    if cache is None:
+        cache = _default_cache
+    key = spec_hash(spec)
+    plan = cache.get(key)
+    if plan is not None:
+        return plan
+    solver = cache.layout(spec).copy()
+    for clue in spec['clues']:
+        solver.add_clue(*clue_args(clue))
+    plan = SolvePlan(spec, key, solver)
+    cache.put(plan)
+    return plan
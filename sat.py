@@ -0,0 +1,410 @@
+"""SAT backend: CNF encoding of a puzzle and a small CDCL solver.
+
+Every value/house pair is a boolean variable (one-hot encoding). Each
+value sits in exactly one house and each house holds exactly one value of
+every category, so all-different becomes pairs of exactly-one
+constraints. A clue relation ``x in house h => y in one of table[h]``
+becomes one clause per house, generated from the same per-house tables
+the bitmask search uses, so both backends solve literally the same
+constraints.
+
+``CDCLSolver`` is a plain conflict-driven clause-learning solver: two
+watched literals, first-UIP learning, VSIDS-style activities, phase saving
+and Luby restarts. It needs nothing outside the standard library.
+Further solutions are enumerated by adding a clause that blocks the
+previous model.
+"""
+
+import heapq
+
+from search_stats import clock
+from solve_trace import SOLUTION
+
+
+def luby(i):
+    """The ``i``-th (0-based) element of the Luby restart sequence 1 1 2 1 1 2 4 ..."""
+    size, seq = 1, 0
+    while size < i + 1:
+        seq += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        seq -= 1
+        i %= size
+    return 1 << seq
+
+
+class CDCLSolver:
+    """Incremental CDCL solver over DIMACS-style literals (``v`` / ``-v``)."""
+
+    restart_base = 100
+    decay = 0.95
+
+    def __init__(self, num_vars):
+        self.num_vars = num_vars
+        # Internal literal 2*v is v, 2*v + 1 is -v; values are per literal
+        self._values = [0] * (2 * num_vars + 2)
+        self._watches = [[] for _ in range(2 * num_vars + 2)]
+        self._level = [0] * (num_vars + 1)
+        self._reason = [None] * (num_vars + 1)
+        self._activity = [0.0] * (num_vars + 1)
+        self._phase = [True] * (num_vars + 1)
+        self._seen = [False] * (num_vars + 1)
+        self._heap = [(0.0, var) for var in range(1, num_vars + 1)]
+        self._trail = []
+        self._trail_lim = []
+        self._qhead = 0
+        self._bump = 1.0
+        self._restarts = 0
+        self.ok = True
+        self.decisions = 0
+        self.conflicts = 0
+
+    def add_clause(self, literals):
+        """Add a clause; returns False once the formula is unsatisfiable."""
+        if not self.ok:
+            return False
+        self._cancel_until(0)
+        values = self._values
+        clause = []
+        for literal in literals:
+            lit = 2 * literal if literal > 0 else -2 * literal + 1
+            value = values[lit]
+            if value == 1 or lit ^ 1 in clause:
+                return True
+            if value == 0 and lit not in clause:
+                clause.append(lit)
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self._enqueue(clause[0], None)
+            self.ok = self._propagate() is None
+        else:
+            self._watches[clause[0]].append(clause)
+            self._watches[clause[1]].append(clause)
+        return self.ok
+
+    def solve(self):
+        """Search for a model; True leaves it readable through ``model()``."""
+        if not self.ok:
+            return False
+        while True:
+            status = self._search(self.restart_base * luby(self._restarts))
+            if status is not None:
+                return status
+            self._restarts += 1
+
+    def model(self):
+        """Variables set to true in the last model found."""
+        values = self._values
+        return [var for var in range(1, self.num_vars + 1) if values[2 * var] == 1]
+
+    def _search(self, budget):
+        conflicts = 0
+        while True:
+            conflict = self._propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                conflicts += 1
+                if not self._trail_lim:
+                    self.ok = False
+                    return False
+                learnt, level = self._analyze(conflict)
+                self._cancel_until(level)
+                if len(learnt) == 1:
+                    self._enqueue(learnt[0], None)
+                else:
+                    self._watches[learnt[0]].append(learnt)
+                    self._watches[learnt[1]].append(learnt)
+                    self._enqueue(learnt[0], learnt)
+                self._bump /= self.decay
+            elif conflicts >= budget:
+                self._cancel_until(0)
+                return None
+            else:
+                var = self._pick()
+                if var is None:
+                    return True
+                self.decisions += 1
+                self._trail_lim.append(len(self._trail))
+                self._enqueue(2 * var if self._phase[var] else 2 * var + 1, None)
+
+    def _enqueue(self, lit, reason):
+        self._values[lit] = 1
+        self._values[lit ^ 1] = -1
+        var = lit >> 1
+        self._level[var] = len(self._trail_lim)
+        self._reason[var] = reason
+        self._trail.append(lit)
+
+    def _propagate(self):
+        """Unit propagation; returns a conflicting clause or None."""
+        values = self._values
+        watches = self._watches
+        trail = self._trail
+        while self._qhead < len(trail):
+            false_lit = trail[self._qhead] ^ 1
+            self._qhead += 1
+            watching = watches[false_lit]
+            watches[false_lit] = kept = []
+            for i, clause in enumerate(watching):
+                # Keep the falsified watch in slot 1
+                if clause[0] == false_lit:
+                    clause[0] = clause[1]
+                    clause[1] = false_lit
+                first = clause[0]
+                if values[first] == 1:
+                    kept.append(clause)
+                    continue
+                for k in range(2, len(clause)):
+                    other = clause[k]
+                    if values[other] != -1:
+                        clause[1] = other
+                        clause[k] = false_lit
+                        watches[other].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if values[first] == -1:
+                        kept.extend(watching[i + 1:])
+                        self._qhead = len(trail)
+                        return clause
+                    self._enqueue(first, clause)
+        return None
+
+    def _analyze(self, conflict):
+        """First-UIP learning; returns the learnt clause and the level to jump to."""
+        seen = self._seen
+        level = self._level
+        reason = self._reason
+        trail = self._trail
+        current = len(self._trail_lim)
+        learnt = [None]
+        pending = 0
+        clause = conflict
+        start = 0
+        index = len(trail) - 1
+        while True:
+            for k in range(start, len(clause)):
+                lit = clause[k]
+                var = lit >> 1
+                if not seen[var] and level[var] > 0:
+                    seen[var] = True
+                    self._bump_activity(var)
+                    if level[var] == current:
+                        pending += 1
+                    else:
+                        learnt.append(lit)
+            while not seen[trail[index] >> 1]:
+                index -= 1
+            lit = trail[index]
+            index -= 1
+            var = lit >> 1
+            seen[var] = False
+            pending -= 1
+            if pending == 0:
+                break
+            # Slot 0 of a reason clause is the literal it implied
+            clause = reason[var]
+            start = 1
+        learnt[0] = lit ^ 1
+        back = 0
+        for k in range(1, len(learnt)):
+            var = learnt[k] >> 1
+            seen[var] = False
+            if level[var] > back:
+                back = level[var]
+                learnt[1], learnt[k] = learnt[k], learnt[1]
+        return learnt, back
+
+    def _bump_activity(self, var):
+        activity = self._activity
+        activity[var] += self._bump
+        if activity[var] > 1e100:
+            for other in range(1, self.num_vars + 1):
+                activity[other] *= 1e-100
+            self._bump *= 1e-100
+            self._heap = [(-activity[other], other) for other in range(1, self.num_vars + 1)
+                          if self._values[2 * other] == 0]
+            heapq.heapify(self._heap)
+        elif self._values[2 * var] == 0:
+            heapq.heappush(self._heap, (-activity[var], var))
+
+    def _pick(self):
+        heap = self._heap
+        values = self._values
+        while heap:
+            var = heapq.heappop(heap)[1]
+            if values[2 * var] == 0:
+                return var
+        return None
+
+    def _cancel_until(self, level):
+        if len(self._trail_lim) <= level:
+            return
+        start = self._trail_lim[level]
+        values = self._values
+        activity = self._activity
+        heap = self._heap
+        for lit in self._trail[start:]:
+            var = lit >> 1
+            values[lit] = values[lit ^ 1] = 0
+            self._reason[var] = None
+            self._phase[var] = not lit & 1
+            heapq.heappush(heap, (-activity[var], var))
+        del self._trail[start:]
+        del self._trail_lim[level:]
+        self._qhead = len(self._trail)
+        if len(heap) > 4 * self.num_vars:
+            self._heap = [(-activity[var], var) for var in set(var for _, var in heap)
+                          if values[2 * var] == 0]
+            heapq.heapify(self._heap)
+
+
+def encode(solver):
+    """CNF clauses (lists of DIMACS literals) for a ``BitmaskSolver``'s puzzle.
+
+    Variable ``i * houses + h + 1`` is true when value ``i`` (in
+    ``solver.values`` order) lives in 0-based house ``h``.
+    """
+    houses = solver.houses
+    clauses = []
+
+    def exactly_one(literals):
+        clauses.append(literals)
+        for i, first in enumerate(literals):
+            for second in literals[i + 1:]:
+                clauses.append([-first, -second])
+
+    for i, mask in enumerate(solver.domains):
+        exactly_one([i * houses + h + 1 for h in range(houses)])
+        for h in range(houses):
+            if not mask >> h & 1:
+                clauses.append([-(i * houses + h + 1)])
+    for members in solver.categories:
+        for h in range(houses):
+            exactly_one([i * houses + h + 1 for i in members])
+    # Both directions of every binary clue are stored in ``relations``
+    for x, related in enumerate(solver.relations):
+        for y, table, _ in related:
+            for h in range(houses):
+                clause = [-(x * houses + h + 1)]
+                clause.extend(y * houses + g + 1 for g in range(houses) if table[h] >> g & 1)
+                clauses.append(clause)
+    return clauses
+
+
+def to_dimacs(solver):
+    """The puzzle as a DIMACS CNF string, for checking with an external solver."""
+    clauses = encode(solver)
+    lines = [f'p cnf {len(solver.values) * solver.houses} {len(clauses)}']
+    lines.extend(' '.join(map(str, clause)) + ' 0' for clause in clauses)
+    return '\n'.join(lines) + '\n'
+
+
+# Measured with ``benchmark.py --engines``: the SAT backend pays a fixed
+# encoding cost and only wins once propagation leaves a large search open
+SAT_MIN_OPEN = 45
+SAT_MIN_OPEN_FRACTION = 0.85
+
+
+def choose_engine(solver):
+    """``'sat'`` or ``'bitmask'``, whichever is expected to be faster.
+
+    Small puzzles always use the bitmask search. Larger ones use SAT when
+    root propagation leaves at least ``SAT_MIN_OPEN`` values (and
+    ``SAT_MIN_OPEN_FRACTION`` of all values) undecided, as in clue-minimal
+    generated puzzles; densely clued puzzles are left to the bitmask
+    search, which propagation then solves with little or no branching.
+    """
+    if len(solver.values) < SAT_MIN_OPEN:
+        return 'bitmask'
+    root = solver.root_domains()
+    if root is None:
+        return 'bitmask'
+    undecided = sum(1 for mask in root if mask & (mask - 1))
+    if undecided >= SAT_MIN_OPEN and undecided >= SAT_MIN_OPEN_FRACTION * len(root):
+        return 'sat'
+    return 'bitmask'
+
+
+class SatEngine:
+    """Solves a ``BitmaskSolver``'s puzzle through its CNF encoding.
+
+    Offers the same solving modes as the solver; ``ordering`` keywords are
+    accepted for interchangeability and ignored. In ``SearchStats``,
+    ``nodes`` counts decisions and ``backtracks`` counts conflicts. The
+    CDCL search itself is not traced: a trace gets the root deductions of
+    the solver's propagation and one event per solution.
+    """
+
+    def __init__(self, solver):
+        self.solver = solver
+        self.houses = solver.houses
+        self.values = list(solver.values)
+        self.clauses = encode(solver)
+        self.last_stats = None
+
+    def new_stats(self, trace=None):
+        return self.solver.new_stats(trace)
+
+    def iter_houses(self, stats=None, **ordering):
+        """Yield solutions as tuples of 0-based houses in value order."""
+        if stats is None:
+            stats = self.new_stats()
+        self.last_stats = stats
+        trace = stats.trace
+        sat = CDCLSolver(len(self.values) * self.houses)
+        started = clock()
+        try:
+            if trace is not None:
+                self.solver.root_domains(stats)
+            for clause in self.clauses:
+                if not sat.add_clause(clause):
+                    return
+            while True:
+                decisions, conflicts = sat.decisions, sat.conflicts
+                found = sat.solve()
+                stats.nodes += sat.decisions - decisions
+                stats.backtracks += sat.conflicts - conflicts
+                if not found:
+                    return
+                model = sat.model()
+                if trace is not None:
+                    trace.record((SOLUTION,))
+                stats.solutions += 1
+                stats.search_ns += clock() - started
+                yield tuple((var - 1) % self.houses for var in model)
+                started = clock()
+                sat.add_clause([-var for var in model])
+        finally:
+            stats.search_ns += clock() - started
+
+    def iter_solutions(self, stats=None, **ordering):
+        for houses in self.iter_houses(stats):
+            yield {value: house + 1 for value, house in zip(self.values, houses)}
+
+    def get_solutions(self):
+        return list(self.iter_solutions())
+
+    def first_solution(self, stats=None, **ordering):
+        return self.first_and_count(1, stats)[0]
+
+    def count_solutions(self, limit=None, stats=None, **ordering):
+        return self.first_and_count(limit, stats)[1]
+
+    def first_and_count(self, limit=None, stats=None, **ordering):
+        first = None
+        count = 0
+        solutions = self.iter_solutions(stats)
+        for solution in solutions:
+            if first is None:
+                first = solution
+            count += 1
+            if count == limit:
+                break
+        solutions.close()
+        return first, count
+
+    def is_unique(self, stats=None, **ordering):
+        return self.count_solutions(2, stats) == 1
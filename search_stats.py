@@ -0,0 +1,70 @@
+"""Counters collected by the solver's search loop.
+
+``SearchStats`` is filled in place by ``BitmaskSolver.iter_solutions`` and
+``propagation.propagate``. Every counter is a plain int or a list of ints
+indexed by clue or category, so recording is a handful of integer adds per
+constraint revision and can stay enabled in production runs. An optional
+``solve_trace.Trace`` additionally records the individual events.
+"""
+
+import time
+
+clock = time.perf_counter_ns
+
+
+class SearchStats:
+    """Search-tree and per-constraint counters for one solve."""
+
+    __slots__ = (
+        'clue_labels', 'category_labels', 'trace',
+        'nodes', 'backtracks', 'solutions', 'search_ns',
+        'clue_calls', 'clue_rejections', 'clue_ns',
+        'alldiff_calls', 'alldiff_rejections', 'alldiff_ns',
+    )
+
+    def __init__(self, clue_labels, category_labels, trace=None):
+        self.clue_labels = list(clue_labels)
+        self.category_labels = list(category_labels)
+        self.trace = trace
+        self.nodes = 0
+        self.backtracks = 0
+        self.solutions = 0
+        self.search_ns = 0
+        self.clue_calls = [0] * len(self.clue_labels)
+        self.clue_rejections = [0] * len(self.clue_labels)
+        self.clue_ns = [0] * len(self.clue_labels)
+        self.alldiff_calls = [0] * len(self.category_labels)
+        self.alldiff_rejections = [0] * len(self.category_labels)
+        self.alldiff_ns = [0] * len(self.category_labels)
+
+    @property
+    def search_seconds(self):
+        return self.search_ns / 1e9
+
+    def constraints(self):
+        """Per-constraint rows, most expensive first."""
+        rows = []
+        for label, calls, rejections, ns in zip(
+                self.clue_labels, self.clue_calls, self.clue_rejections, self.clue_ns):
+            rows.append({'constraint': label, 'calls': calls,
+                         'rejections': rejections, 'seconds': ns / 1e9})
+        for label, calls, rejections, ns in zip(
+                self.category_labels, self.alldiff_calls,
+                self.alldiff_rejections, self.alldiff_ns):
+            rows.append({'constraint': f'all_different({label})', 'calls': calls,
+                         'rejections': rejections, 'seconds': ns / 1e9})
+        rows.sort(key=lambda row: row['seconds'], reverse=True)
+        return rows
+
+    def as_dict(self):
+        return {
+            'nodes': self.nodes,
+            'backtracks': self.backtracks,
+            'solutions': self.solutions,
+            'search_seconds': self.search_seconds,
+            'constraints': self.constraints(),
+        }
+
+    def __repr__(self):
+        return (f"SearchStats(nodes={self.nodes}, backtracks={self.backtracks}, "
+                f"solutions={self.solutions}, search_seconds={self.search_seconds:.6f})")
@@ -0,0 +1,387 @@
+"""Long-running solve service speaking JSON over HTTP.
+
+    python server.py --port 8080 --workers 4
+    curl -d @puzzles/zebra.json http://127.0.0.1:8080/solve
+
+Endpoints:
+
+- ``POST /solve`` takes a puzzle spec as the JSON body and returns the
+  solution count, whether the solution is unique, the first solution as
+  ``{value: house}`` and as one ``{category: value}`` row per house, and
+  the solve statistics.
+- ``GET /stats`` reports the cache and pool counters.
+
+Specs are validated on the event loop, then canonicalized and solved in a
+process pool, so a slow puzzle never blocks other requests. Results are
+kept in an LRU keyed by the spec's canonical form
+(``symmetry.canonicalize``): a spec that only renames or reorders values,
+changes clue texts or mirrors the house order of one solved before is
+answered from cache. A request for a puzzle that
+is still being solved waits for that solve instead of starting another
+one. Each response says how it was served in ``cache``: ``hit``, ``miss``
+or ``coalesced``.
+
+Only the little HTTP/1.1 the endpoints need is implemented (no chunked
+bodies, no TLS); keep the server on a local or trusted interface.
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from batch import solve_spec
+from house_table import HouseTable
+from puzzle_spec import clue_args, normalize_spec, spec_hash
+from symmetry import canonicalize
+
+MAX_BODY = 1 << 20
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class HTTPError(Exception):
+    """An error answered with ``status`` and a JSON ``{"error": message}`` body."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def solve_request(spec, max_solutions=2):
+    """Solve a normalized spec (runs in a worker).
+
+    The per-constraint counters are unlabeled ``(calls, rejections, ns)``
+    triples in spec order, clues first, then categories, so the service
+    can file them under canonical ids.
+    """
+    result = solve_spec(spec, max_solutions=max_solutions)
+    stats = result.stats
+    return {
+        'solution_count': result.solution_count,
+        'solution': result.solution,
+        'seconds': result.seconds,
+        'stats': {
+            'nodes': stats.nodes,
+            'backtracks': stats.backtracks,
+            'solutions': stats.solutions,
+            'search_seconds': stats.search_seconds,
+            'clues': list(zip(stats.clue_calls, stats.clue_rejections, stats.clue_ns)),
+            'categories': list(zip(stats.alldiff_calls, stats.alldiff_rejections,
+                                   stats.alldiff_ns)),
+        },
+    }
+
+
+def canonical_stats(spec, form, stats):
+    """``solve_request`` stats of ``spec`` with the counters keyed by canonical id.
+
+    Equivalent specs can repeat a clue; each canonical clue keeps its
+    counters in spec order.
+    """
+    clues = {}
+    for clue, counters in zip(spec['clues'], stats['clues']):
+        clues.setdefault(form.clue_id(*clue_args(clue)), []).append(counters)
+    categories = {form.category_id(values): counters
+                  for values, counters in zip(spec['categories'].values(), stats['categories'])}
+    return dict(stats, clues=clues, categories=categories)
+
+
+def spec_stats(spec, form, stats):
+    """Canonical stats in the ``SearchStats.as_dict`` layout, labeled with ``spec``'s own values."""
+    rows = []
+    seen = {}
+    for clue in spec['clues']:
+        kind, a, b = clue_args(clue)
+        key = form.clue_id(kind, a, b)
+        occurrence = seen[key] = seen.get(key, -1) + 1
+        calls, rejections, ns = stats['clues'][key][occurrence]
+        rows.append({'constraint': f'{kind}({a}, {b})', 'calls': calls,
+                     'rejections': rejections, 'seconds': ns / 1e9})
+    for name, values in spec['categories'].items():
+        calls, rejections, ns = stats['categories'][form.category_id(values)]
+        rows.append({'constraint': f'all_different({name})', 'calls': calls,
+                     'rejections': rejections, 'seconds': ns / 1e9})
+    rows.sort(key=lambda row: row['seconds'], reverse=True)
+    return {
+        'nodes': stats['nodes'],
+        'backtracks': stats['backtracks'],
+        'solutions': stats['solutions'],
+        'search_seconds': stats['search_seconds'],
+        'constraints': rows,
+    }
+
+
+def house_rows(spec, solution):
+    """One ``{"house": n, category: value, ...}`` row per house, or None."""
+    if solution is None:
+        return None
+    table = HouseTable(solution, spec['categories'], spec['houses'])
+    return [{'house': house, **table.house_row(house)} for house in range(1, spec['houses'] + 1)]
+
+
+class SolveService:
+    """Solves specs in a process pool behind an LRU of results.
+
+    Results are stored and coalesced under the spec's canonical form (see
+    ``symmetry``), so a puzzle that only renames values or mirrors the
+    houses of one solved before is answered from cache.
+    ``max_solutions`` bounds each search (the default 2 is enough to tell
+    unique puzzles apart); ``solution_count`` saturates at it.
+    """
+
+    def __init__(self, workers=None, cache_size=1024, max_solutions=2):
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_size = cache_size
+        self.max_solutions = max_solutions
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._results = OrderedDict()
+        self._forms = OrderedDict()
+        self._pending = {}
+        self._pending_forms = {}
+        # Workers start while the event loop and the pool's own threads are
+        # running; forking a threaded process can deadlock the child on a lock
+        # it inherited held, so they are spawned instead
+        self._executor = ProcessPoolExecutor(self.workers,
+                                             mp_context=multiprocessing.get_context('spawn'))
+
+    async def solve(self, spec):
+        """Return ``(result, how)`` for a spec mapping; ValueError if it is invalid."""
+        spec = normalize_spec(spec)
+        form = await self._form(spec)
+        entry = self._results.get(form.key)
+        if entry is not None:
+            self._results.move_to_end(form.key)
+            self.hits += 1
+            return self._result(spec, form, entry), 'hit'
+        pending = self._pending.get(form.key)
+        if pending is not None:
+            self.coalesced += 1
+            how = 'coalesced'
+        else:
+            self.misses += 1
+            how = 'miss'
+            pending = asyncio.ensure_future(self._solve_canonical(spec, form))
+            self._pending[form.key] = pending
+            pending.add_done_callback(partial(self._finished, form.key))
+        # Shielded so a client hanging up does not cancel a solve others wait for
+        entry = await asyncio.shield(pending)
+        return self._result(spec, form, entry), how
+
+    async def _form(self, spec):
+        """Canonical form of ``spec``, remembered for specs sent again verbatim.
+
+        Canonicalizing a large, sparsely clued spec can take a tenth of a
+        second, so it runs in the pool like a solve, and concurrent
+        requests for the same spec share one computation.
+        """
+        key = spec_hash(spec)
+        form = self._forms.get(key)
+        if form is not None:
+            self._forms.move_to_end(key)
+            return form
+        pending = self._pending_forms.get(key)
+        if pending is None:
+            loop = asyncio.get_running_loop()
+            pending = loop.run_in_executor(self._executor, canonicalize, spec)
+            self._pending_forms[key] = pending
+            pending.add_done_callback(partial(self._canonicalized, key))
+        return await asyncio.shield(pending)
+
+    def _canonicalized(self, key, future):
+        del self._pending_forms[key]
+        if future.cancelled() or future.exception() is not None:
+            return
+        self._forms[key] = future.result()
+        while len(self._forms) > self.cache_size:
+            self._forms.popitem(last=False)
+
+    async def _solve_canonical(self, spec, form):
+        loop = asyncio.get_running_loop()
+        entry = await loop.run_in_executor(self._executor, solve_request, spec,
+                                           self.max_solutions)
+        if entry['solution'] is not None:
+            entry['solution'] = form.to_canonical(entry['solution'])
+        # Stats name the solved spec's values; keep them by canonical id so
+        # equivalent specs get them back in their own names
+        entry['stats'] = canonical_stats(spec, form, entry['stats'])
+        return entry
+
+    def _finished(self, key, future):
+        del self._pending[key]
+        if future.cancelled() or future.exception() is not None:
+            return
+        self._results[key] = future.result()
+        while len(self._results) > self.cache_size:
+            self._results.popitem(last=False)
+
+    def _result(self, spec, form, entry):
+        """The ``/solve`` response for ``spec`` from a canonical cache entry."""
+        solution = entry['solution']
+        if solution is not None:
+            solution = form.from_canonical(solution)
+        return {
+            'key': spec_hash(spec),
+            'canonical_key': form.key,
+            'solution_count': entry['solution_count'],
+            'unique': entry['solution_count'] == 1,
+            'solution': solution,
+            'houses': house_rows(spec, solution),
+            'seconds': entry['seconds'],
+            'stats': spec_stats(spec, form, entry['stats']),
+        }
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'cached': len(self._results),
+            'cache_size': self.cache_size,
+            'pending': len(self._pending),
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+        }
+
+    async def handle(self, method, path, body):
+        """Route one request; returns ``(status, payload)``."""
+        path = path.split('?', 1)[0]
+        if path == '/solve':
+            if method != 'POST':
+                raise HTTPError(405, "use POST /solve")
+            try:
+                spec = json.loads(body)
+            except ValueError as exc:
+                raise HTTPError(400, f"invalid JSON: {exc}") from None
+            try:
+                result, how = await self.solve(spec)
+            except ValueError as exc:
+                raise HTTPError(400, str(exc)) from None
+            return 200, dict(result, cache=how)
+        if path == '/stats':
+            if method != 'GET':
+                raise HTTPError(405, "use GET /stats")
+            return 200, self.stats()
+        raise HTTPError(404, f"no endpoint {path}")
+
+    async def serve_connection(self, reader, writer):
+        """Answer requests on one connection until the client closes it."""
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except HTTPError as exc:
+                    # The stream position is unknown after a malformed request
+                    writer.write(_response(exc.status, {'error': str(exc)}, keep_alive=False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                try:
+                    status, payload = await self.handle(method, path, body)
+                except HTTPError as exc:
+                    status, payload = exc.status, {'error': str(exc)}
+                except Exception as exc:
+                    status, payload = 500, {'error': f"{type(exc).__name__}: {exc}"}
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=8080, backlog=1024):
+        """Start listening; returns the ``asyncio.Server`` (``port=0`` picks a free one).
+
+        The worker processes are started first, so the first requests do
+        not wait for interpreters to boot.
+        """
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, os.getpid)
+                               for _ in range(self.workers)))
+        return await asyncio.start_server(self.serve_connection, host, port, backlog=backlog)
+
+    def close(self):
+        self._executor.shutdown(cancel_futures=True)
+
+
+async def _readline(reader):
+    try:
+        return await reader.readline()
+    except ValueError:
+        # The stream's line limit (64 KiB) was exceeded
+        raise HTTPError(400, "request or header line too long") from None
+
+
+async def _read_request(reader):
+    """``(method, path, headers, body)`` of the next request, or None at end of stream."""
+    line = await _readline(reader)
+    if not line.strip():
+        return None
+    try:
+        method, path, _version = line.decode('latin-1').split()
+    except ValueError:
+        raise HTTPError(400, "malformed request line") from None
+    headers = {}
+    while True:
+        line = await _readline(reader)
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise HTTPError(400, "invalid Content-Length") from None
+    if length < 0:
+        raise HTTPError(400, "invalid Content-Length")
+    if length > MAX_BODY:
+        raise HTTPError(413, f"request body over {MAX_BODY} bytes")
+    body = await reader.readexactly(length) if length else b''
+    return method, path, headers, body
+
+
+def _response(status, payload, keep_alive=True):
+    body = json.dumps(payload).encode('utf-8')
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode('latin-1') + body
+
+
+async def serve(host='127.0.0.1', port=8080, workers=None, cache_size=1024):
+    """Run the service until cancelled."""
+    service = SolveService(workers, cache_size)
+    server = await service.start(host, port)
+    print(f"Serving on http://{host}:{server.sockets[0].getsockname()[1]} "
+          f"with {service.workers} workers")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Serve puzzle solves over HTTP/JSON")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=None,
+                        help="solver processes (default: number of CPUs)")
+    parser.add_argument('--cache-size', type=int, default=1024,
+                        help="results kept in the LRU (default: 1024)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.cache_size))
+    except KeyboardInterrupt:
+        pass
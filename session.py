@@ -0,0 +1,108 @@
+"""Stateful solving for puzzles edited one clue at a time.
+
+``SolverSession`` keeps the propagated root domains and the solutions
+found so far between edits:
+
+- ``add_clue`` narrows the root from its previous fixpoint and re-checks
+  the known solutions against the new clue instead of searching; when the
+  previous search was exhaustive the survivors are exactly the new
+  solutions.
+- ``remove_clue`` re-propagates the remaining clues from the cached
+  category layout. Every known solution stays valid, but clues may now
+  admit more, so the next query searches again.
+
+Typical use::
+
+    session = SolverSession.from_path('puzzles/zebra.json')
+    session.remove_clue('at_position', 'milk', 3)
+    session.count_solutions()
+    session.add_clue('at_position', 'milk', 3)
+    session.is_unique()
+"""
+
+from itertools import islice
+
+from puzzle_spec import clue_args, clue_spec, compile_layout, load_spec
+from solver import clue_holds
+
+
+class SolverSession:
+    """A puzzle whose clues can be added and removed between solves.
+
+    ``ordering`` keywords (``variable_order``, ``value_order``) are used
+    for every search the session runs.
+    """
+
+    def __init__(self, spec, cache=None, **ordering):
+        self.houses = spec['houses']
+        self.categories = {name: list(values) for name, values in spec['categories'].items()}
+        self.ordering = ordering
+        self._layout = compile_layout(spec, cache)
+        self._layout.root_domains()
+        self._solver = self._build(clue_args(clue) for clue in spec.get('clues', ()))
+        self._known = []
+        self._complete = False
+
+    @classmethod
+    def from_path(cls, path, cache=None, **ordering):
+        return cls(load_spec(path), cache, **ordering)
+
+    @property
+    def clues(self):
+        """The current clues as ``(kind, a, b)`` triples, in insertion order."""
+        return list(self._solver.clues)
+
+    def spec(self):
+        """The current puzzle as a normalized spec."""
+        return {
+            'houses': self.houses,
+            'categories': {name: list(values) for name, values in self.categories.items()},
+            'clues': [clue_spec(*clue) for clue in self._solver.clues],
+        }
+
+    def new_stats(self, trace=None):
+        return self._solver.new_stats(trace)
+
+    def add_clue(self, kind, a, b):
+        """Add a clue (see ``BitmaskSolver.add_clue``)."""
+        self._solver.add_clue(kind, a, b)
+        self._known = [solution for solution in self._known
+                       if clue_holds(kind, a, b, solution)]
+
+    def remove_clue(self, kind, a, b):
+        """Remove a clue previously added; ValueError if there is none."""
+        clues = self.clues
+        try:
+            clues.remove((kind, a, b))
+        except ValueError:
+            raise ValueError(f"no clue {kind}({a}, {b}) to remove") from None
+        self._solver = self._build(clues)
+        self._complete = False
+
+    def solutions(self, limit=None, stats=None):
+        """Up to ``limit`` solutions (all when None), searching only if needed."""
+        if self._complete or (limit is not None and len(self._known) >= limit):
+            return self._known[:limit]
+        found = self._solver.iter_solutions(stats, **self.ordering)
+        try:
+            self._known = list(islice(found, limit))
+        finally:
+            found.close()
+        self._complete = limit is None or len(self._known) < limit
+        return list(self._known)
+
+    def first_solution(self, stats=None):
+        solutions = self.solutions(1, stats)
+        return solutions[0] if solutions else None
+
+    def count_solutions(self, limit=None, stats=None):
+        return len(self.solutions(limit, stats))
+
+    def is_unique(self, stats=None):
+        return self.count_solutions(2, stats) == 1
+
+    def _build(self, clues):
+        solver = self._layout.copy()
+        for clue in clues:
+            solver.add_clue(*clue)
+        return solver
@@ -0,0 +1,156 @@
+"""Compact array-backed solutions and a contiguous NumPy batch container.
+
+A solution of a puzzle with K categories and N houses is stored as a K x N
+``int8`` matrix whose row ``k`` is a permutation: entry ``[k, i]`` is the
+0-based house of value ``i`` of category ``k``. Category and value names
+live once in a shared ``Vocabulary``, so a stored solution costs K*N bytes
+instead of a dict of K*N strings.
+
+``SolutionBatch`` stacks many such matrices into one (M, K, N) array that
+can be handed to NumPy code as-is and converted back to the ``{value:
+house}`` dict form on demand.
+
+This module needs NumPy; the solver core does not import it.
+"""
+
+import numpy as np
+
+DTYPE = np.int8
+
+
+class Vocabulary:
+    """Category and value names shared by every solution of a layout."""
+
+    __slots__ = ('categories', 'values', 'houses', '_position')
+
+    def __init__(self, categories):
+        self.categories = list(categories)
+        self.values = [list(values) for values in categories.values()]
+        self.houses = len(self.values[0]) if self.values else 0
+        if self.houses > np.iinfo(DTYPE).max + 1:
+            raise ValueError(f"{self.houses} houses do not fit in {np.dtype(DTYPE).name}")
+        self._position = {}
+        for k, values in enumerate(self.values):
+            for i, value in enumerate(values):
+                self._position[value] = (k, i)
+
+    @classmethod
+    def from_spec(cls, spec):
+        return cls(spec['categories'])
+
+    @property
+    def shape(self):
+        return (len(self.categories), self.houses)
+
+    def position(self, value):
+        """``(category index, value index)`` of ``value``."""
+        return self._position[value]
+
+    def encode(self, solution):
+        """``{value: house}`` dict to a K x N permutation matrix."""
+        matrix = np.empty(self.shape, dtype=DTYPE)
+        for k, values in enumerate(self.values):
+            matrix[k] = [solution[value] - 1 for value in values]
+        return matrix
+
+    def decode(self, matrix):
+        """K x N permutation matrix back to the ``{value: house}`` dict."""
+        solution = {}
+        for values, row in zip(self.values, matrix.tolist()):
+            for value, house in zip(values, row):
+                solution[value] = house + 1
+        return solution
+
+    def __eq__(self, other):
+        return (isinstance(other, Vocabulary)
+                and self.categories == other.categories and self.values == other.values)
+
+    def __reduce__(self):
+        return Vocabulary, (dict(zip(self.categories, self.values)),)
+
+
+class SolutionBatch:
+    """Growable stack of solutions in one contiguous ``int8`` array."""
+
+    def __init__(self, vocabulary, capacity=16):
+        self.vocabulary = vocabulary
+        self._data = np.empty((max(1, capacity),) + vocabulary.shape, dtype=DTYPE)
+        self._size = 0
+
+    @classmethod
+    def from_solutions(cls, vocabulary, solutions):
+        """Encode an iterable of ``{value: house}`` dicts."""
+        batch = cls(vocabulary)
+        for solution in solutions:
+            batch.append(vocabulary.encode(solution))
+        return batch
+
+    @classmethod
+    def from_array(cls, vocabulary, array):
+        """Wrap an existing (M, K, N) array (copied to contiguous int8)."""
+        array = np.ascontiguousarray(array, dtype=DTYPE)
+        if array.ndim != 3 or array.shape[1:] != vocabulary.shape:
+            raise ValueError(f"expected shape (M, {vocabulary.shape[0]}, {vocabulary.shape[1]}), "
+                             f"got {array.shape}")
+        batch = cls(vocabulary, len(array))
+        batch._data[:len(array)] = array
+        batch._size = len(array)
+        return batch
+
+    @classmethod
+    def collect(cls, plan, limit=None, stats=None, **ordering):
+        """Solve ``plan`` straight into a batch without per-solution dicts.
+
+        Values are registered category by category, so the solver's flat
+        house tuples reshape directly into K x N matrices.
+        """
+        batch = cls(Vocabulary.from_spec(plan.spec))
+        shape = batch.vocabulary.shape
+        for count, houses in enumerate(plan.iter_houses(stats, **ordering), 1):
+            batch.append(np.asarray(houses, dtype=DTYPE).reshape(shape))
+            if count == limit:
+                break
+        return batch
+
+    @property
+    def array(self):
+        """(M, K, N) view of the stored solutions."""
+        return self._data[:self._size]
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        """The ``index``-th solution as a ``{value: house}`` dict."""
+        return self.vocabulary.decode(self.array[index])
+
+    def __iter__(self):
+        for matrix in self.array:
+            yield self.vocabulary.decode(matrix)
+
+    def append(self, matrix):
+        if self._size == len(self._data):
+            grown = np.empty((2 * len(self._data),) + self._data.shape[1:], dtype=DTYPE)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+        self._data[self._size] = matrix
+        self._size += 1
+
+    def extend(self, other):
+        """Append every solution of another batch with the same vocabulary."""
+        if other.vocabulary != self.vocabulary:
+            raise ValueError("batches have different vocabularies")
+        for matrix in other.array:
+            self.append(matrix)
+
+    def houses_of(self, value):
+        """1-based house of ``value`` in every solution, as an int array."""
+        k, i = self.vocabulary.position(value)
+        return self.array[:, k, i].astype(np.int16) + 1
+
+    def to_dicts(self):
+        return list(self)
+
+    @property
+    def nbytes(self):
+        return self.array.nbytes
@@ -0,0 +1,186 @@
+"""Append-only binary store of solved puzzles, readable through ``numpy.memmap``.
+
+File layout::
+
+    magic   b'ZEBRASOL'
+    uint32  format version
+    uint32  length of the JSON header
+    JSON    vocabulary (categories and values) and the record dtype
+    padding up to a multiple of 64 bytes
+    records fixed-width, see ``record_dtype``
+
+Every record holds the puzzle's spec hash, its solve statistics and the
+first solution as a K x N ``int8`` permutation matrix (see
+``solution_array``), all -1 when the puzzle has no solution. Fixed-width
+records let a reader memory-map the whole file and scan one field across
+millions of puzzles without copying or decoding.
+
+Appends are crash safe: a batch of records goes out in one ``write`` on
+an ``O_APPEND`` descriptor followed by ``fsync``, and a torn trailing
+record left by a crash is ignored by readers and cut off by the next
+writer. The header is written to a temporary file and renamed into place.
+"""
+
+import json
+import os
+import struct
+
+import numpy as np
+
+from solution_array import DTYPE, Vocabulary
+
+MAGIC = b'ZEBRASOL'
+VERSION = 1
+ALIGNMENT = 64
+_PREAMBLE = struct.Struct('<8sII')
+
+
+def record_dtype(shape):
+    """Structured dtype of one record for a K x N solution ``shape``."""
+    return np.dtype([
+        # Raw bytes: an 'S32' field would drop a hash's trailing zero bytes
+        ('spec_hash', 'u1', 32),
+        ('solution_count', '<u4'),
+        ('seconds', '<f8'),
+        ('nodes', '<u8'),
+        ('backtracks', '<u8'),
+        ('solution', DTYPE, shape),
+    ], align=True)
+
+
+class SolutionStore:
+    """A solution file bound to one vocabulary.
+
+    Opening a missing path creates it, which requires ``vocabulary``;
+    opening an existing file reads the vocabulary from its header.
+    """
+
+    def __init__(self, path, vocabulary=None, sync=True):
+        self.path = path
+        self.sync = sync
+        if not os.path.exists(path):
+            if vocabulary is None:
+                raise ValueError(f"{path} does not exist and no vocabulary was given")
+            self._write_header(vocabulary)
+        self._read_header()
+        if vocabulary is not None and vocabulary != self.vocabulary:
+            raise ValueError(f"{path} was written for a different vocabulary")
+
+    def _write_header(self, vocabulary):
+        header = json.dumps({
+            'categories': dict(zip(vocabulary.categories, vocabulary.values)),
+            'record_size': record_dtype(vocabulary.shape).itemsize,
+        }).encode('utf-8')
+        size = _PREAMBLE.size + len(header)
+        padding = b'\0' * (-size % ALIGNMENT)
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(_PREAMBLE.pack(MAGIC, VERSION, len(header)) + header + padding)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def _read_header(self):
+        with open(self.path, 'rb') as f:
+            magic, version, length = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+            if magic != MAGIC:
+                raise ValueError(f"{self.path} is not a solution store")
+            if version != VERSION:
+                raise ValueError(f"{self.path} has unsupported format version {version}")
+            header = json.loads(f.read(length).decode('utf-8'))
+        self.vocabulary = Vocabulary(header['categories'])
+        self.dtype = record_dtype(self.vocabulary.shape)
+        if header['record_size'] != self.dtype.itemsize:
+            raise ValueError(f"{self.path} has records of {header['record_size']} bytes, "
+                             f"expected {self.dtype.itemsize}")
+        size = _PREAMBLE.size + length
+        self.offset = size + (-size % ALIGNMENT)
+
+    def __len__(self):
+        """Number of complete records; a torn trailing record is not counted."""
+        return max(0, os.path.getsize(self.path) - self.offset) // self.dtype.itemsize
+
+    def new_records(self, count):
+        """A zeroed record array to fill in and pass to ``append_records``."""
+        records = np.zeros(count, dtype=self.dtype)
+        records['solution'] = -1
+        return records
+
+    def append(self, spec_hash, solution=None, solution_count=None, seconds=0.0,
+               nodes=0, backtracks=0):
+        """Append one puzzle; ``solution`` is a ``{value: house}`` dict or matrix."""
+        records = self.new_records(1)
+        self._fill(records[0], spec_hash, solution, solution_count, seconds, nodes, backtracks)
+        self.append_records(records)
+
+    def append_results(self, results):
+        """Append ``batch.SolveResult`` objects in a single write."""
+        results = list(results)
+        records = self.new_records(len(results))
+        for record, result in zip(records, results):
+            stats = result.stats
+            self._fill(record, result.key, result.solution, result.solution_count,
+                       result.seconds, stats.nodes if stats else 0,
+                       stats.backtracks if stats else 0)
+        self.append_records(records)
+
+    def _fill(self, record, spec_hash, solution, solution_count, seconds, nodes, backtracks):
+        if isinstance(spec_hash, str):
+            spec_hash = bytes.fromhex(spec_hash)
+        record['spec_hash'] = np.frombuffer(spec_hash, dtype=np.uint8)
+        if solution is not None:
+            if isinstance(solution, dict):
+                solution = self.vocabulary.encode(solution)
+            record['solution'] = solution
+        if solution_count is None:
+            solution_count = 0 if solution is None else 1
+        record['solution_count'] = solution_count
+        record['seconds'] = seconds
+        record['nodes'] = nodes
+        record['backtracks'] = backtracks
+
+    def append_records(self, records):
+        """Durably append a record array built with ``new_records``."""
+        data = np.ascontiguousarray(records, dtype=self.dtype).tobytes()
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+        try:
+            # Cut off a record torn by an earlier crash so the file stays aligned
+            size = os.fstat(fd).st_size
+            torn = (size - self.offset) % self.dtype.itemsize
+            if torn:
+                os.ftruncate(fd, size - torn)
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            if self.sync:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def records(self):
+        """Read-only memory map over every complete record (zero copy)."""
+        count = len(self)
+        if count == 0:
+            return np.zeros(0, dtype=self.dtype)
+        return np.memmap(self.path, dtype=self.dtype, mode='r',
+                         offset=self.offset, shape=(count,))
+
+    def solutions(self):
+        """(M, K, N) view of the stored solution matrices."""
+        return self.records()['solution']
+
+    def houses_of(self, value):
+        """1-based house of ``value`` in every stored solution (0 if unsolved)."""
+        k, i = self.vocabulary.position(value)
+        return self.records()['solution'][:, k, i].astype(np.int16) + 1
+
+    def spec_hash(self, index):
+        """Hex spec hash of the ``index``-th record."""
+        return self.records()[index]['spec_hash'].tobytes().hex()
+
+    def solution(self, index):
+        """The ``index``-th stored solution as a dict, or None if unsolved."""
+        record = self.records()[index]
+        if record['solution_count'] == 0:
+            return None
+        return self.vocabulary.decode(record['solution'])
@@ -0,0 +1,103 @@
+"""Bounded record of the deductions and decisions behind a solve.
+
+Pass a ``Trace`` to ``new_stats(trace=...)`` and the solver appends one
+plain tuple per event to a ``collections.deque`` with a fixed ``maxlen``.
+Recording costs one append, and memory stays bounded however long the
+search runs: the oldest events are dropped first. Events are::
+
+    ('narrow', source, var, before, after)   propagation removed houses
+    ('branch', var, house)                    search tries var in 0-based house
+    ('backtrack', var, house)                 that choice led to a wipe-out
+    ('solution',)                             every value has a house
+
+``source`` is the index of the clue that narrowed the domain, or ``~k``
+for the all-different constraint of category ``k``; ``before`` and
+``after`` are bitmask domains as in ``solver.BitmaskSolver`` (``after`` is
+0 when the narrowing wiped the domain out). A traced solve always
+propagates the root again, so its root deductions are recorded even
+when the root domains are already cached on the solver. The SAT engine
+records those root deductions and its solutions, not its CDCL search.
+"""
+
+from collections import deque
+
+NARROW = 'narrow'
+BRANCH = 'branch'
+BACKTRACK = 'backtrack'
+SOLUTION = 'solution'
+
+
+def _houses(mask):
+    return ', '.join(str(house + 1) for house in range(mask.bit_length()) if mask >> house & 1)
+
+
+class Trace:
+    """Ring buffer of the most recent ``maxlen`` solver events."""
+
+    __slots__ = ('events', 'total')
+
+    def __init__(self, maxlen=1024):
+        self.events = deque(maxlen=maxlen)
+        self.total = 0
+
+    def record(self, event):
+        self.events.append(event)
+        self.total += 1
+
+    @property
+    def dropped(self):
+        """Events that no longer fit in the buffer."""
+        return self.total - len(self.events)
+
+    def __len__(self):
+        return len(self.events)
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def clear(self):
+        self.events.clear()
+        self.total = 0
+
+    def describe(self, solver, clue_texts=None):
+        """The buffered events as dicts with a readable ``text``.
+
+        ``clue_texts`` replaces the solver's generic clue labels, e.g. with
+        the wording from the spec. Narrowings that leave a value with a
+        single house are flagged ``fixed``: those are the deductions.
+        """
+        sources = clue_texts or solver.clue_labels()
+        described = []
+        for event in self.events:
+            kind = event[0]
+            if kind == NARROW:
+                _, source, var, before, after = event
+                if source < 0:
+                    source_text = f"{solver.category_names[~source]} values all differ"
+                else:
+                    source_text = sources[source]
+                value = solver.values[var]
+                if not after:
+                    text = f"{source_text}: no house left for {value}"
+                elif after & (after - 1):
+                    text = f"{source_text}: {value} in houses {_houses(after)}"
+                else:
+                    text = f"{source_text}: {value} in house {after.bit_length()}"
+                described.append({'event': kind, 'text': text,
+                                  'fixed': bool(after) and not after & (after - 1)})
+            elif kind == SOLUTION:
+                described.append({'event': kind, 'text': "Solution found", 'fixed': False})
+            else:
+                _, var, house = event
+                value = solver.values[var]
+                text = (f"Try {value} in house {house + 1}" if kind == BRANCH
+                        else f"{value} in house {house + 1} fails, backtrack")
+                described.append({'event': kind, 'text': text, 'fixed': False})
+        return described
+
+    def as_dict(self, solver, clue_texts=None):
+        return {
+            'total': self.total,
+            'dropped': self.dropped,
+            'events': self.describe(solver, clue_texts),
+        }
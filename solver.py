@@ -0,0 +1,390 @@
+"""Native bitmask search engine for Zebra-style puzzles.
+
+Every category is a permutation of its values over the houses. The domain
+of a value is an integer bitmask where bit ``i`` stands for house ``i + 1``,
+and every clue is compiled into per-house lookup tables so that committing
+a value to a house narrows each related value with a single AND.
+
+By default the domains are also kept at the AC-3 + all-different fixpoint
+(see ``propagation``) before search and after every branching decision.
+The order in which values and houses are tried is chosen per solve from
+the strategies in ``ordering``.
+"""
+
+from ordering import VARIABLE_ORDERINGS, VALUE_ORDERINGS
+from propagation import propagate
+from search_stats import SearchStats, clock
+from solve_trace import NARROW, BRANCH, BACKTRACK, SOLUTION
+
+SAME_HOUSE = 'same_house'
+NEXT_TO = 'next_to'
+RIGHT_OF = 'right_of'
+AT_POSITION = 'at_position'
+
+CLUE_KINDS = (SAME_HOUSE, NEXT_TO, RIGHT_OF, AT_POSITION)
+
+
+def clue_holds(kind, a, b, solution):
+    """Whether clue ``(kind, a, b)`` is satisfied by a ``{value: house}`` dict."""
+    if kind == SAME_HOUSE:
+        return solution[a] == solution[b]
+    if kind == NEXT_TO:
+        return abs(solution[a] - solution[b]) == 1
+    if kind == RIGHT_OF:
+        return solution[a] == solution[b] + 1
+    return solution[a] == b
+
+
+class BitmaskSolver:
+    """Backtracking solver over bitmask domains.
+
+    Values are registered category by category with ``add_category`` and
+    related with ``add_clue``. Solutions are returned in the same form as
+    ``constraint.Problem.getSolutions()``: a dict mapping every value to
+    its 1-based house number.
+
+    With ``propagation=False`` the search only forward-checks each
+    assignment, which is cheaper per node but explores a larger tree.
+    ``variable_order`` and ``value_order`` name the default strategies from
+    ``ordering.VARIABLE_ORDERINGS`` and ``ordering.VALUE_ORDERINGS``; each
+    solve may override them.
+    """
+
+    def __init__(self, houses, propagation=True, variable_order='input',
+                 value_order='ascending'):
+        if houses < 1:
+            raise ValueError("a puzzle needs at least one house")
+        self.houses = houses
+        self.full_mask = (1 << houses) - 1
+        self.categories = []
+        self.category_names = []
+        self.values = []
+        self.category_of = []
+        self.index = {}
+        self.domains = []
+        self.relations = []
+        self.clues = []
+        self.propagation = propagation
+        self.variable_order = variable_order
+        self.value_order = value_order
+        self.last_stats = None
+        self._root = None
+        self._degrees = None
+
+    @property
+    def num_variables(self):
+        return len(self.values)
+
+    @property
+    def num_constraints(self):
+        # One all-different constraint per category plus one per clue
+        return len(self.categories) + len(self.clues)
+
+    def add_category(self, values, name=None):
+        """Register a category whose values are a permutation of the houses."""
+        values = list(values)
+        if len(values) != self.houses:
+            raise ValueError(
+                f"category has {len(values)} values but the puzzle has {self.houses} houses")
+        members = []
+        for value in values:
+            if value in self.index:
+                raise ValueError(f"duplicate value {value!r}")
+            var = len(self.values)
+            self.index[value] = var
+            self.values.append(value)
+            self.category_of.append(len(self.categories))
+            self.domains.append(self.full_mask)
+            self.relations.append([])
+            members.append(var)
+        self.categories.append(members)
+        self.category_names.append(name if name is not None else f'category{len(self.categories)}')
+        self._invalidate()
+
+    def add_clue(self, kind, a, b):
+        """Relate value ``a`` to value ``b`` (or to a house for AT_POSITION).
+
+        SAME_HOUSE:  a and b share a house
+        NEXT_TO:     a and b live in adjacent houses
+        RIGHT_OF:    a lives immediately to the right of b (a == b + 1)
+        AT_POSITION: a lives in house b (1-based)
+        """
+        if kind not in CLUE_KINDS:
+            raise ValueError(f"unknown clue kind {kind!r}")
+        x = self._var(a)
+        if kind == AT_POSITION:
+            if not 1 <= b <= self.houses:
+                raise ValueError(f"house {b} is outside 1..{self.houses}")
+            self.domains[x] &= 1 << (b - 1)
+            changed = (x,)
+        else:
+            y = self._var(b)
+            forward, backward = self._tables(kind)
+            clue = len(self.clues)
+            self.relations[x].append((y, forward, clue))
+            self.relations[y].append((x, backward, clue))
+            changed = (x, y)
+        self.clues.append((kind, a, b))
+        self._degrees = None
+        self._narrow_root(changed)
+
+    def copy(self):
+        """Return an independent solver with the same categories and clues."""
+        clone = BitmaskSolver(self.houses, self.propagation, self.variable_order,
+                              self.value_order)
+        clone.categories = [list(members) for members in self.categories]
+        clone.category_names = list(self.category_names)
+        clone.values = list(self.values)
+        clone.category_of = list(self.category_of)
+        clone.index = dict(self.index)
+        clone.domains = list(self.domains)
+        clone.relations = [list(related) for related in self.relations]
+        clone.clues = list(self.clues)
+        clone._root = self._root
+        clone._degrees = self._degrees
+        return clone
+
+    def degrees(self):
+        """Number of clue relations touching each value."""
+        if self._degrees is None:
+            self._degrees = [len(related) for related in self.relations]
+        return self._degrees
+
+    def clue_labels(self):
+        return [f'{kind}({a}, {b})' for kind, a, b in self.clues]
+
+    def new_stats(self, trace=None):
+        """An empty ``SearchStats`` sized for this solver's constraints.
+
+        Pass a ``solve_trace.Trace`` to also record the individual events.
+        """
+        return SearchStats(self.clue_labels(), self.category_names, trace)
+
+    def root_domains(self, stats=None):
+        """Domains before the first branching decision, or None if infeasible.
+
+        Unary clues are already folded into ``domains`` by ``add_clue``;
+        with propagation enabled the result is also at the AC-3 +
+        all-different fixpoint. The result is cached until the next edit;
+        a traced ``stats`` propagates again anyway, so the trace always
+        shows the root deductions however the root was first computed.
+        """
+        traced = stats is not None and stats.trace is not None
+        if self._root is None or traced:
+            root = list(self.domains)
+            if traced:
+                # Unary clues narrowed their value in add_clue; trace them first
+                for clue, (kind, a, b) in enumerate(self.clues):
+                    if kind == AT_POSITION:
+                        stats.trace.record((NARROW, clue, self.index[a],
+                                            self.full_mask, 1 << (b - 1)))
+            if not all(root):
+                root = False
+            elif self.propagation and not propagate(self, root, range(len(root)), stats):
+                root = False
+            self._root = root
+        return self._root or None
+
+    def get_solutions(self):
+        """Return every solution as a list of ``{value: house}`` dicts."""
+        return list(self.iter_solutions())
+
+    def iter_solutions(self, stats=None, **ordering):
+        """Yield solutions one at a time as the search finds them.
+
+        The search keeps only the current branch in memory, so stopping
+        early (``first_solution``, ``count_solutions(limit)``) also stops
+        the work. Counters are recorded into ``stats`` (a fresh
+        ``SearchStats`` by default), which is also left in ``last_stats``.
+        ``variable_order`` and ``value_order`` override the solver's
+        default strategies for this solve.
+        """
+        for domains in self.iter_domains(stats, **ordering):
+            yield self._solution(domains)
+
+    def iter_houses(self, stats=None, **ordering):
+        """Yield solutions as tuples of 0-based houses in value order.
+
+        Skips building a dict per solution; ``values`` gives the order.
+        """
+        for domains in self.iter_domains(stats, **ordering):
+            yield tuple(mask.bit_length() - 1 for mask in domains)
+
+    def iter_domains(self, stats=None, variable_order=None, value_order=None):
+        """The search itself: yields the single-house domains of each solution."""
+        select = VARIABLE_ORDERINGS[variable_order or self.variable_order]
+        order_values = VALUE_ORDERINGS[value_order or self.value_order]
+        if stats is None:
+            stats = self.new_stats()
+        self.last_stats = stats
+        trace = stats.trace
+        started = clock()
+        try:
+            root = self.root_domains(stats)
+            if root is None:
+                return
+            var = select(self, root, 0)
+            if var is None:
+                if trace is not None:
+                    trace.record((SOLUTION,))
+                stats.solutions += 1
+                stats.search_ns += clock() - started
+                yield root
+                started = clock()
+                return
+            # Each frame: domains, values branched on, value, houses left to try
+            stack = [(root, 0, var, iter(order_values(self, root, var)))]
+            while stack:
+                domains, assigned, var, houses = stack[-1]
+                house = next(houses, None)
+                if house is None:
+                    stack.pop()
+                    continue
+                stats.nodes += 1
+                if trace is not None:
+                    trace.record((BRANCH, var, house))
+                reduced = self._assign(domains, var, house, stats)
+                if reduced is None:
+                    if trace is not None:
+                        trace.record((BACKTRACK, var, house))
+                    stats.backtracks += 1
+                    continue
+                assigned |= 1 << var
+                var = select(self, reduced, assigned)
+                if var is None:
+                    if trace is not None:
+                        trace.record((SOLUTION,))
+                    stats.solutions += 1
+                    stats.search_ns += clock() - started
+                    yield reduced
+                    started = clock()
+                else:
+                    stack.append((reduced, assigned, var,
+                                  iter(order_values(self, reduced, var))))
+        finally:
+            stats.search_ns += clock() - started
+
+    def first_solution(self, stats=None, **ordering):
+        """Return the first solution found, or None.
+
+        Here and in the other solving modes, ``ordering`` keywords are
+        passed on to ``iter_solutions``.
+        """
+        solutions = self.iter_solutions(stats, **ordering)
+        try:
+            return next(solutions, None)
+        finally:
+            solutions.close()
+
+    def count_solutions(self, limit=None, stats=None, **ordering):
+        """Count solutions, stopping once ``limit`` have been found."""
+        return self.first_and_count(limit, stats, **ordering)[1]
+
+    def first_and_count(self, limit=None, stats=None, **ordering):
+        """Return ``(first_solution, count)`` without keeping the others.
+
+        With a ``limit`` the search stops after that many solutions, so the
+        count saturates at ``limit``.
+        """
+        first = None
+        count = 0
+        solutions = self.iter_solutions(stats, **ordering)
+        for solution in solutions:
+            if first is None:
+                first = solution
+            count += 1
+            if count == limit:
+                break
+        solutions.close()
+        return first, count
+
+    def is_unique(self, stats=None, **ordering):
+        """True when exactly one solution exists; stops at the second."""
+        return self.count_solutions(2, stats, **ordering) == 1
+
+    def _narrow_root(self, changed):
+        """Fold a new clue into the cached root domains.
+
+        A clue only ever removes options, so continuing propagation from
+        the previous fixpoint reaches the same fixpoint as starting over
+        while only revisiting what the clue touches.
+        """
+        root = self._root
+        if not root:
+            # Not computed yet, or already infeasible (and staying so)
+            return
+        root = list(root)
+        for var in changed:
+            root[var] &= self.domains[var]
+        if not all(root[var] for var in changed):
+            root = False
+        elif self.propagation and not propagate(self, root, changed):
+            root = False
+        self._root = root
+
+    def _invalidate(self):
+        self._root = None
+        self._degrees = None
+
+    def _var(self, value):
+        try:
+            return self.index[value]
+        except KeyError:
+            raise ValueError(f"unknown value {value!r}") from None
+
+    def _tables(self, kind):
+        """Build the per-house allowed masks for both ends of a relation.
+
+        ``forward[h]`` is the mask of houses the second value may take when
+        the first one sits in house ``h``; ``backward`` is the converse.
+        """
+        full = self.full_mask
+        bits = [1 << h for h in range(self.houses)]
+        if kind == SAME_HOUSE:
+            return bits, bits
+        if kind == NEXT_TO:
+            table = [((bit << 1) | (bit >> 1)) & full for bit in bits]
+            return table, table
+        # RIGHT_OF: first == second + 1
+        return [bit >> 1 for bit in bits], [(bit << 1) & full for bit in bits]
+
+    def _assign(self, domains, var, house, stats):
+        """Commit ``var`` to ``house`` and filter; None on a wipe-out."""
+        bit = 1 << house
+        domains = list(domains)
+        domains[var] = bit
+        if self.propagation:
+            return domains if propagate(self, domains, (var,), stats) else None
+        category = self.category_of[var]
+        trace = stats.trace
+        started = clock()
+        stats.alldiff_calls[category] += 1
+        for peer in self.categories[category]:
+            if peer != var:
+                narrowed = domains[peer] & ~bit
+                if trace is not None and narrowed != domains[peer]:
+                    trace.record((NARROW, ~category, peer, domains[peer], narrowed))
+                if not narrowed:
+                    stats.alldiff_rejections[category] += 1
+                    stats.alldiff_ns[category] += clock() - started
+                    return None
+                domains[peer] = narrowed
+        stats.alldiff_ns[category] += clock() - started
+        for other, table, clue in self.relations[var]:
+            started = clock()
+            narrowed = domains[other] & table[house]
+            stats.clue_calls[clue] += 1
+            stats.clue_ns[clue] += clock() - started
+            if trace is not None and narrowed != domains[other]:
+                trace.record((NARROW, clue, other, domains[other], narrowed))
+            if not narrowed:
+                stats.clue_rejections[clue] += 1
+                return None
+            domains[other] = narrowed
+        return domains
+
+    def _solution(self, domains):
+        return {
+            value: domains[i].bit_length()
+            for i, value in enumerate(self.values)
+        }
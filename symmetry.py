@@ -0,0 +1,240 @@
+"""Canonical forms of puzzle specs up to relabeling and mirroring.
+
+Two puzzles are equivalent when one turns into the other by renaming
+values within their categories (which candy is called "Hershey"),
+reordering categories or their values, and possibly reading the houses
+right to left. Mirroring maps house ``p`` to ``N + 1 - p``, swaps the two
+sides of every ``right_of`` clue and moves ``at_position`` clues, so it
+is only a symmetry of the puzzle when the clues survive that change.
+
+``canonicalize`` labels every value with a ``(category, index)`` id such
+that equivalent specs get the same clue list, and hashes that list into
+``CanonicalForm.key``. The labeling comes from colour refinement on the
+graph of categories, values and clues, individualizing one vertex at a
+time where refinement leaves ties, and taking the labeling, mirrored or
+not, with the smallest clue list. Symmetric puzzles can have very many
+tied labelings, so at most ``max_leaves`` are compared; past that, two
+equivalent specs may get different keys (a missed cache hit), but equal
+keys always mean equivalent puzzles, so answers mapped through a form
+are always correct.
+
+``SymmetryCache`` solves each equivalence class once and answers the
+rest by mapping the cached solution back::
+
+    cache = SymmetryCache()
+    solution, count, hit = cache.solve(spec)
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+
+from puzzle_spec import clue_args, compile_spec, normalize_spec
+from solver import SAME_HOUSE, RIGHT_OF, AT_POSITION
+
+MAX_LEAVES = 64
+# Edge labels of the refinement graph
+_MEMBER, _SAME_HOUSE, _NEXT_TO, _RIGHT_OF, _LEFT_OF = range(5)
+
+
+class CanonicalForm:
+    """How one spec maps onto its canonical form.
+
+    ``labels`` maps each value to its canonical ``(category, index)`` id
+    and ``values`` maps ids back; ``mirrored`` says the canonical form
+    reads the houses right to left.
+    """
+
+    __slots__ = ('key', 'houses', 'mirrored', 'labels', 'values')
+
+    def __init__(self, key, houses, mirrored, labels):
+        self.key = key
+        self.houses = houses
+        self.mirrored = mirrored
+        self.labels = labels
+        self.values = {label: value for value, label in labels.items()}
+
+    def __repr__(self):
+        return f"CanonicalForm(key={self.key[:12]}..., mirrored={self.mirrored})"
+
+    def _house(self, house):
+        return self.houses + 1 - house if self.mirrored else house
+
+    def to_canonical(self, solution):
+        """``{value: house}`` of this spec as ``{id: house}`` of the canonical form."""
+        return {self.labels[value]: self._house(house) for value, house in solution.items()}
+
+    def from_canonical(self, solution):
+        """Inverse of ``to_canonical``: a canonical solution in this spec's values and houses."""
+        return {self.values[label]: self._house(house) for label, house in solution.items()}
+
+    def clue_id(self, kind, a, b):
+        """Clue ``(kind, a, b)`` of this spec as it appears in the canonical encoding."""
+        if self.mirrored:
+            kind, a, b = mirror_clue(kind, a, b, self.houses)
+        return _canonical_clue(kind, a, b, self.labels)
+
+    def category_id(self, values):
+        """Canonical index of the category holding ``values``."""
+        return self.labels[values[0]][0]
+
+
+def mirror_clue(kind, a, b, houses):
+    """The clue ``(kind, a, b)`` with the houses read right to left."""
+    if kind == RIGHT_OF:
+        return kind, b, a
+    if kind == AT_POSITION:
+        return kind, a, houses + 1 - b
+    return kind, a, b
+
+
+def canonicalize(spec, max_leaves=MAX_LEAVES):
+    """Return the ``CanonicalForm`` of a normalized spec."""
+    houses = spec['houses']
+    categories = [list(values) for values in spec['categories'].values()]
+    clues = [clue_args(clue) for clue in spec['clues']]
+    best = None
+    for mirrored in (False, True):
+        oriented = [mirror_clue(*clue, houses) for clue in clues] if mirrored else clues
+        encoding, labels = _search(categories, oriented, houses, max_leaves)
+        if best is None or encoding < best[0]:
+            best = (encoding, labels, mirrored)
+    encoding, labels, mirrored = best
+    payload = json.dumps(encoding, separators=(',', ':'))
+    key = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    return CanonicalForm(key, houses, mirrored, labels)
+
+
+def _search(categories, clues, houses, max_leaves):
+    """Smallest ``(encoding, labels)`` over the labelings the refinement search reaches.
+
+    Vertices ``0..K-1`` are the categories, the values follow in spec
+    order. Colours are ranks of sorted signatures, so they only depend on
+    the structure and never on names or input order.
+    """
+    values = [value for members in categories for value in members]
+    index = {value: len(categories) + i for i, value in enumerate(values)}
+    adjacency = [[] for _ in range(len(categories) + len(values))]
+    for c, members in enumerate(categories):
+        for value in members:
+            adjacency[c].append((_MEMBER, index[value]))
+            adjacency[index[value]].append((_MEMBER, c))
+    positions = [[] for _ in adjacency]
+    for kind, a, b in clues:
+        for value in (a,) if kind == AT_POSITION else (a, b):
+            if value not in index:
+                raise ValueError(f"unknown value {value!r}")
+        x = index[a]
+        if kind == AT_POSITION:
+            positions[x].append(b)
+            continue
+        y = index[b]
+        if kind == RIGHT_OF:
+            adjacency[x].append((_RIGHT_OF, y))
+            adjacency[y].append((_LEFT_OF, x))
+        else:
+            label = _SAME_HOUSE if kind == SAME_HOUSE else _NEXT_TO
+            adjacency[x].append((label, y))
+            adjacency[y].append((label, x))
+    # Categories and values start apart; values also by their fixed houses
+    initial = [(0, ())] * len(categories) + [
+        (1, tuple(sorted(fixed))) for fixed in positions[len(categories):]]
+    colors = _refine(_ranks(initial), adjacency)
+
+    best = []
+    leaves = [0]
+
+    def visit(colors):
+        if leaves[0] >= max_leaves:
+            return
+        cells = {}
+        for vertex, color in enumerate(colors):
+            cells.setdefault(color, []).append(vertex)
+        ties = [cell for color, cell in sorted(cells.items()) if len(cell) > 1]
+        if not ties:
+            leaves[0] += 1
+            leaf = _encode(colors, categories, clues, index, houses)
+            if not best or leaf[0] < best[0][0]:
+                best[:] = [leaf]
+            return
+        for vertex in ties[0]:
+            split = _ranks([(color, u != vertex) for u, color in enumerate(colors)])
+            visit(_refine(split, adjacency))
+
+    visit(colors)
+    return best[0]
+
+
+def _ranks(signatures):
+    order = {signature: rank for rank, signature in enumerate(sorted(set(signatures)))}
+    return [order[signature] for signature in signatures]
+
+
+def _refine(colors, adjacency):
+    """Split colour classes by their neighbours' colours until stable."""
+    classes = len(set(colors))
+    while True:
+        colors = _ranks([
+            (colors[v], tuple(sorted((label, colors[u]) for label, u in neighbours)))
+            for v, neighbours in enumerate(adjacency)
+        ])
+        refined = len(set(colors))
+        if refined == classes:
+            return colors
+        classes = refined
+
+
+def _encode(colors, categories, clues, index, houses):
+    """Clue list and labels under the discrete colouring ``colors``."""
+    order = sorted(range(len(categories)), key=colors.__getitem__)
+    category_rank = {c: rank for rank, c in enumerate(order)}
+    labels = {}
+    for c, members in enumerate(categories):
+        for i, value in enumerate(sorted(members, key=lambda value: colors[index[value]])):
+            labels[value] = (category_rank[c], i)
+    encoded = sorted(_canonical_clue(kind, a, b, labels) for kind, a, b in clues)
+    return (houses, len(categories), encoded), labels
+
+
+def _canonical_clue(kind, a, b, labels):
+    if kind == AT_POSITION:
+        return kind, labels[a], b
+    if kind == RIGHT_OF:
+        return kind, labels[a], labels[b]
+    return (kind, *sorted((labels[a], labels[b])))
+
+
+class SymmetryCache:
+    """Least-recently-used solutions keyed by canonical form.
+
+    Stores the first solution (in canonical ids) and the solution count,
+    saturated at ``max_solutions``, for each equivalence class.
+    """
+
+    def __init__(self, maxsize=1024, max_solutions=2):
+        self.maxsize = maxsize
+        self.max_solutions = max_solutions
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def solve(self, spec):
+        """Return ``(solution, count, hit)`` for a spec, solving only on a miss."""
+        spec = normalize_spec(spec)
+        form = canonicalize(spec)
+        entry = self._entries.get(form.key)
+        if entry is not None:
+            self._entries.move_to_end(form.key)
+            self.hits += 1
+            solution, count = entry
+            return (None if solution is None else form.from_canonical(solution)), count, True
+        self.misses += 1
+        solution, count = compile_spec(spec).first_and_count(self.max_solutions)
+        self._entries[form.key] = (
+            None if solution is None else form.to_canonical(solution), count)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return solution, count, False
@@ -0,0 +1,44 @@
+"""Importing and rendering must not write into the project.
+
+    python -m pytest -q
+"""
+
+import os
+
+import pytest
+
+import benchmark
+import environment
+from puzzle_spec import STOCK_SPEC
+from zebra_puzzle import solve_zebra_puzzle
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _project_files():
+    """``{path: (size, mtime)}`` of the project's files, bytecode caches aside."""
+    files = {}
+    for root, dirs, names in os.walk(HERE):
+        dirs[:] = [name for name in dirs if name not in ('__pycache__', '.git', '.pytest_cache')]
+        for name in names:
+            stat = os.stat(os.path.join(root, name))
+            files[os.path.join(root, name)] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def test_imports_write_nothing():
+    assert benchmark.import_writes() == []
+
+
+@pytest.mark.parametrize('warnings', [(), ("numpy is not installed (requirements.txt pins 2.2.6)",)])
+def test_render_files_writes_only_figures(tmp_path, monkeypatch, capsys, warnings):
+    monkeypatch.setattr(environment, 'check_environment', lambda: warnings)
+    monkeypatch.chdir(tmp_path)
+    before = _project_files()
+    solution = solve_zebra_puzzle(STOCK_SPEC, render='files', output_dir='figures')
+    assert solution['zebra'] == 5
+    assert _project_files() == before
+    assert os.listdir(tmp_path) == ['figures']
+    assert 'summary.png' in os.listdir(tmp_path / 'figures')
+    for warning in warnings:
+        assert f"Warning: {warning}" in capsys.readouterr().out
@@ -0,0 +1,54 @@
+"""Round trips through the append-only solution store."""
+
+import os
+
+from batch import solve_spec
+from puzzle_spec import STOCK_SPEC, load_spec
+from solution_array import Vocabulary
+from solution_store import SolutionStore
+
+# Hashes ending in zero bytes were cut short by the old 'S32' field
+HASHES = ['ab' * 31 + '00', '00' * 32, 'ff' * 32]
+
+
+def _store(tmp_path):
+    spec = load_spec(STOCK_SPEC)
+    return SolutionStore(str(tmp_path / 'corpus.zsol'), Vocabulary.from_spec(spec), sync=False)
+
+
+def test_append_and_read(tmp_path):
+    store = _store(tmp_path)
+    result = solve_spec(STOCK_SPEC)
+    store.append_results([result])
+    store.append(HASHES[0], solution_count=0)
+    store.append_records(store.new_records(0))
+    for spec_hash in HASHES[1:]:
+        store.append(spec_hash, result.solution, 2, 0.5, 7, 3)
+
+    reopened = SolutionStore(store.path)
+    assert reopened.vocabulary == store.vocabulary
+    assert len(reopened) == 1 + len(HASHES)
+    assert [reopened.spec_hash(i) for i in range(len(reopened))] == [result.key, *HASHES]
+    assert reopened.solution(0) == result.solution
+    assert reopened.solution(1) is None
+    assert reopened.solution(2) == result.solution
+    records = reopened.records()
+    assert list(records['solution_count']) == [1, 0, 2, 2]
+    assert list(records['nodes'][2:]) == [7, 7]
+    assert list(reopened.houses_of('zebra')) == [5, 0, 5, 5]
+
+
+def test_torn_tail_is_ignored_then_cut(tmp_path):
+    store = _store(tmp_path)
+    store.append(HASHES[0])
+    store.append(HASHES[1])
+    size = os.path.getsize(store.path)
+    # A crash in the middle of writing the next record
+    with open(store.path, 'ab') as f:
+        f.write(b'\x01' * (store.dtype.itemsize // 2))
+    assert len(store) == 2
+    assert store.spec_hash(1) == HASHES[1]
+
+    store.append(HASHES[2])
+    assert os.path.getsize(store.path) == size + store.dtype.itemsize
+    assert [store.spec_hash(i) for i in range(len(store))] == HASHES
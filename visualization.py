@@ -2,46 +2,141 @@ import matplotlib.pyplot as plt
 import networkx as nx
 import numpy as np
 from matplotlib.patches import Rectangle
-from matplotlib.colors import LinearSegmentedColormap
+from matplotlib.colors import LinearSegmentedColormap, is_color_like
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+import os
 import time
 
+from graph_layout import LAYOUT_CACHE, cached_layout, constraint_graph
+from house_table import HouseTable
+from puzzle_spec import STOCK_SPEC, category_label, load_spec
+
+# Cell tints for the solution matrix, cycled when there are more categories
+CATEGORY_TINTS = ['#e3f2fd', '#e8f5e9', '#fff3e0', '#fce4ec', '#f3f3f3',
+                  '#ede7f6', '#e0f7fa', '#f9fbe7']
+
+# Constraint graph: node colour per category (cycled) and edge style per clue kind
+GRAPH_NODE_COLORS = ['lightblue', 'lightgreen', 'lightyellow', 'lightpink', 'lightgray',
+                     'plum', 'paleturquoise', 'wheat']
+GRAPH_EDGE_STYLES = {
+    'same_house': {'style': 'solid', 'arrows': False},
+    'next_to': {'style': 'dashed', 'arrows': False},
+    'right_of': {'style': 'solid', 'arrows': True, 'arrowstyle': '-|>', 'arrowsize': 15},
+}
+
+# Step-by-step figure: rows per column and text colour per trace event
+STEP_ROWS = 40
+STEP_COLORS = {'narrow': 'black', 'branch': 'tab:blue', 'backtrack': 'tab:red',
+               'solution': 'green'}
+
+def house_facecolor(solution, index):
+    """Fill colour for a house: its color attribute when matplotlib knows it."""
+    colors = solution.get('color')
+    if colors and is_color_like(colors[index]):
+        return colors[index]
+    return 'lightgray'
+
 class Visualization:
-    def __init__(self):
+    """Draws the solution figures.
+
+    By default every figure is shown interactively with ``plt.show()``.
+    With an ``output_dir`` the visualizer runs headless: matplotlib is
+    switched to the Agg backend and each figure is written to
+    ``<output_dir>/<name>.<format>`` for every format in ``formats``.
+    Either way each figure is closed once it is done. ``written``
+    collects the paths of the files produced. Constraint-graph layouts are
+    cached in ``layout_cache`` (None to always recompute them). For many
+    puzzles at once, use ``batch_render.render_batch`` instead.
+    """
+
+    def __init__(self, output_dir=None, formats=('png',), layout_cache=LAYOUT_CACHE):
+        self.output_dir = output_dir
+        self.formats = tuple(formats)
+        self.layout_cache = layout_cache
+        self.written = []
+        if output_dir is not None:
+            plt.switch_backend('Agg')
+            os.makedirs(output_dir, exist_ok=True)
         self.start_time = time.time()
         self.stats = {
             'num_constraints': 0,
             'num_variables': 0,
             'solutions_found': 0,
-            'execution_time': 0
+            'execution_time': 0,
+            'search': None,
+            'clues': None,
+            'trace': None,
+            'spec': None
         }
 
-    def update_stats(self, num_constraints, num_variables, solutions_found):
+    def update_stats(self, num_constraints, num_variables, solutions_found, search_stats=None):
+        """Record solver statistics; ``search_stats`` is a ``SearchStats``.
+
+        When search statistics are given, the execution time is the time
+        spent in the solver rather than since this object was created.
+        """
         self.stats['num_constraints'] = num_constraints
         self.stats['num_variables'] = num_variables
         self.stats['solutions_found'] = solutions_found
-        self.stats['execution_time'] = time.time() - self.start_time
+        if search_stats is not None:
+            self.stats['search'] = search_stats.as_dict()
+            self.stats['execution_time'] = search_stats.search_seconds
+        else:
+            self.stats['execution_time'] = time.time() - self.start_time
+
+    def update_spec(self, spec):
+        """Record the puzzle spec the constraint graph is drawn from."""
+        self.stats['spec'] = spec
+
+    def update_trace(self, trace):
+        """Record a described ``solve_trace.Trace`` (its ``as_dict``) for the step-by-step figure."""
+        self.stats['trace'] = trace
+
+    def update_analysis(self, report):
+        """Record an ``analysis.ClueReport`` for the summary figure."""
+        self.stats['clues'] = report.as_dict()
+
+    def _finish(self, fig, name):
+        """Show ``fig`` interactively or write it out and close it."""
+        if self.output_dir is None:
+            plt.show()
+            plt.close(fig)
+            return []
+        paths = []
+        for fmt in self.formats:
+            path = os.path.join(self.output_dir, f'{name}.{fmt}')
+            fig.savefig(path, format=fmt)
+            paths.append(path)
+        plt.close(fig)
+        self.written.extend(paths)
+        return paths
+
+    def render_all(self, solution):
+        """Create every figure for ``solution`` and return the written paths."""
+        solution = HouseTable.from_rows(solution)
+        self.create_house_layout(solution)
+        self.create_constraint_graph()
+        self.create_solution_matrix(solution)
+        self.create_step_by_step(solution)
+        self.create_statistics()
+        self.create_summary(solution)
+        return list(self.written)
 
     def create_house_layout(self, solution):
         """Create a visual layout of the houses and their attributes."""
-        fig, ax = plt.subplots(figsize=(15, 8))
+        solution = HouseTable.from_rows(solution)
+        categories = list(solution)
+        num_houses = solution.houses
+        fig, ax = plt.subplots(figsize=(max(15, 3 * num_houses), 8))
         
         # Create house positions
-        house_positions = {
-            1: (1, 0),
-            2: (2, 0),
-            3: (3, 0),
-            4: (4, 0),
-            5: (5, 0)
-        }
-        
-        # Create custom colormap for houses
-        colors = ['red', 'green', 'ivory', 'yellow', 'blue']
+        house_positions = {house_num: (house_num, 0) for house_num in range(1, num_houses + 1)}
         
         # Draw houses
-        for house_num in range(1, 6):
+        for house_num in range(1, num_houses + 1):
             x, y = house_positions[house_num]
-            house_color = solution['color'][house_num-1]
+            house_color = house_facecolor(solution, house_num - 1)
             
             # Draw house
             rect = Rectangle((x-0.4, y-0.4), 0.8, 0.8, 
@@ -54,115 +149,83 @@ class Visualization:
             
             # Add attributes
             attributes = [
-                ("Nationality", solution['nationality'][house_num-1]),
-                ("Color", solution['color'][house_num-1]),
-                ("Candy", solution['candy'][house_num-1]),
-                ("Drink", solution['drink'][house_num-1]),
-                ("Pet", solution['pet'][house_num-1])
+                (category_label(category), solution.value(category, house_num))
+                for category in categories
             ]
             
             for i, (attr, value) in enumerate(attributes):
                 ax.text(x, y-0.2-i*0.2, f"{attr}: {value}", ha='center', va='center',
                         fontsize=10)
         
-        ax.set_xlim(0, 6)
-        ax.set_ylim(-2, 2)
+        ax.set_xlim(0, num_houses + 1)
+        ax.set_ylim(-0.4 - 0.2 * len(categories), 2)
         ax.axis('off')
         plt.title('Zebra Puzzle Solution Layout')
-        plt.show()
+        return self._finish(fig, 'house_layout')
 
-    def create_constraint_graph(self):
-        """Create a graph showing the relationships between constraints."""
-        G = nx.DiGraph()
-        
-        # Add nodes
-        nodes = {
-            'nationalities': ['Englishman', 'Spaniard', 'Norwegian', 'Ukrainian', 'Japanese'],
-            'colors': ['red', 'green', 'ivory', 'yellow', 'blue'],
-            'candies': ['Hershey', 'Kit Kat', 'Smarties', 'Snickers', 'Milky Way'],
-            'drinks': ['water', 'orange juice', 'tea', 'coffee', 'milk'],
-            'pets': ['dog', 'fox', 'snails', 'horse', 'zebra']
+    def create_constraint_graph(self, spec=None):
+        """Draw the values of ``spec`` (default: the recorded spec) linked by its clues."""
+        if spec is None:
+            spec = self.stats.get('spec') or load_spec(STOCK_SPEC)
+        G = constraint_graph(spec)
+        
+        # Seeded layout, read from disk when this graph was laid out before
+        pos = cached_layout(G, self.layout_cache)
+        fig = plt.figure(figsize=(12, 8))
+        
+        # Draw nodes with a different colour for each category
+        for i, (category, values) in enumerate(spec['categories'].items()):
+            nx.draw_networkx_nodes(G, pos,
+                                 nodelist=values,
+                                 node_color=GRAPH_NODE_COLORS[i % len(GRAPH_NODE_COLORS)],
+                                 node_size=1600, label=category_label(category))
+        
+        # One edge style per clue kind; right_of points from the right-hand value
+        for kind, style in GRAPH_EDGE_STYLES.items():
+            edges = [(a, b) for a, b, kinds in G.edges(data='kinds') if kind in kinds]
+            if edges:
+                nx.draw_networkx_edges(G, pos, edgelist=edges, width=1.5, alpha=0.6,
+                                       node_size=1600, **style)
+        
+        # Values fixed to a house by an at_position clue show that house
+        labels = {
+            value: value if house is None else f"{value}\n(house {house})"
+            for value, house in G.nodes(data='house')
         }
+        nx.draw_networkx_labels(G, pos, labels, font_size=10, font_weight='bold')
         
-        # Add nodes to graph
-        for category in nodes:
-            for item in nodes[category]:
-                G.add_node(item)
-        
-        # Add edges based on constraints
-        constraints = [
-            ('Englishman', 'red'),  # The Englishman lives in the red house
-            ('Spaniard', 'dog'),   # The Spaniard owns the dog
-            ('Norwegian', 'first'),  # The Norwegian lives in the first house
-            ('green', 'ivory'),    # The green house is immediately to the right of the ivory house
-            ('Hershey', 'fox'),    # The man who eats Hershey bars lives in the house next to the man with the fox
-            ('Kit Kat', 'yellow'),  # Kit Kats are eaten in the yellow house
-            ('Norwegian', 'blue'),  # The Norwegian lives next to the blue house
-            ('Smarties', 'snails'),  # The Smarties eater owns snails
-            ('Snickers', 'orange juice'),  # The Snickers eater drinks orange juice
-            ('Ukrainian', 'tea'),  # The Ukrainian drinks tea
-            ('Japanese', 'Milky Way'),  # The Japanese eats Milky Ways
-            ('Kit Kat', 'horse'),  # Kit Kats are eaten in a house next to the house where the horse is kept
-            ('coffee', 'green'),   # Coffee is drunk in the green house
-            ('milk', 'middle')     # Milk is drunk in the middle house
-        ]
-        
-        # Add edges to graph
-        for edge in constraints:
-            G.add_edge(edge[0], edge[1])
-        
-        # Draw graph
-        pos = nx.spring_layout(G)
-        plt.figure(figsize=(12, 8))
-        
-        # Draw nodes with different colors for each category
-        colors = {
-            'nationalities': 'lightblue',
-            'colors': 'lightgreen',
-            'candies': 'lightyellow',
-            'drinks': 'lightpink',
-            'pets': 'lightgray'
-        }
-        
-        for category in nodes:
-            nx.draw_networkx_nodes(G, pos, 
-                                 nodelist=nodes[category],
-                                 node_color=colors[category],
-                                 node_size=2000)
-        
-        nx.draw_networkx_edges(G, pos, width=1.5, alpha=0.5)
-        nx.draw_networkx_labels(G, pos, font_size=10, font_weight='bold')
-        
-        plt.title('Constraint Relationships')
+        plt.legend(loc='upper center', bbox_to_anchor=(0.5, 0.0), ncol=len(spec['categories']),
+                   fontsize=8, markerscale=0.3, frameon=False)
+        plt.title('Constraint Relationships (solid: same house, dashed: next to, '
+                  'arrow: right of)')
         plt.axis('off')
-        plt.show()
+        return self._finish(fig, 'constraint_graph')
 
     def create_solution_matrix(self, solution):
         """Create a matrix showing the final solution."""
-        categories = ['Nationality', 'Color', 'Candy', 'Drink', 'Pet']
-        houses = range(1, 6)
+        solution = HouseTable.from_rows(solution)
+        categories = list(solution)
+        num_houses = solution.houses
+        houses = range(1, num_houses + 1)
         
         # Create matrix
-        matrix = np.zeros((5, 5), dtype=object)
+        matrix = np.zeros((len(categories), num_houses), dtype=object)
         
-        for i, house in enumerate(houses):
-            matrix[0, i] = solution['nationality'][i]
-            matrix[1, i] = solution['color'][i]
-            matrix[2, i] = solution['candy'][i]
-            matrix[3, i] = solution['drink'][i]
-            matrix[4, i] = solution['pet'][i]
+        for i, category in enumerate(categories):
+            for j, house in enumerate(houses):
+                matrix[i, j] = solution.value(category, house)
         
         # Create figure and axis
-        fig, ax = plt.subplots(figsize=(12, 8))
+        fig, ax = plt.subplots(figsize=(max(12, 2 * num_houses), max(8, len(categories))))
         
         # Create table data
         table_data = []
         # Add empty header row
-        table_data.append([''] + ['House 1', 'House 2', 'House 3', 'House 4', 'House 5'])
+        table_data.append([''] + [f'House {house}' for house in houses])
         
         # Add category names as first column
         for i, category in enumerate(categories):
-            row_data = [category] + [str(item) for item in matrix[i]]
+            row_data = [category_label(category)] + [str(item) for item in matrix[i]]
             table_data.append(row_data)
         
         # Create table
@@ -179,53 +242,58 @@ class Visualization:
                 else:
                     cell.set_facecolor('w')
         
-        # Add color coding for each category
-        category_colors = {
-            'Nationality': '#e3f2fd',
-            'Color': '#e8f5e9',
-            'Candy': '#fff3e0',
-            'Drink': '#fce4ec',
-            'Pet': '#f3f3f3'
-        }
-        
-        # Apply colors to cells
+        # Apply colors to cells, one tint per category
         for i, category in enumerate(categories):
-            for j in range(1, 6):
-                table[(i+1, j)].set_facecolor(category_colors[category])
+            for j in range(1, num_houses + 1):
+                table[(i+1, j)].set_facecolor(CATEGORY_TINTS[i % len(CATEGORY_TINTS)])
         
         # Hide axes
         ax.axis('off')
         
         plt.title('Zebra Puzzle Solution Matrix')
-        plt.show()
+        return self._finish(fig, 'solution_matrix')
 
     def create_step_by_step(self, solution):
-        """Create a step-by-step visualization of the solution process."""
-        fig, ax = plt.subplots(figsize=(15, 8))
+        """Show the solver's recorded deductions and decisions in order."""
+        solution = HouseTable.from_rows(solution)
+        fig, ax = plt.subplots(figsize=(15, 10))
         
-        # Create timeline
-        timeline = [
-            "1. Initialize problem with 5 houses",
-            "2. Add variables and domains",
-            "3. Add AllDifferent constraints",
-            "4. Add specific constraints",
-            "5. Solve problem",
-            "6. Find solution"
-        ]
-        
-        # Create timeline visualization
-        for i, step in enumerate(timeline):
-            ax.text(0.1, 0.9 - i*0.1, f"{i+1}. {step}",
+        trace = self.stats.get('trace')
+        if not trace or not trace['events']:
+            ax.text(0.1, 0.9, "No solver trace was recorded",
                     fontsize=12, transform=ax.transAxes)
-        
-        # Add solution highlight
-        ax.text(0.1, 0.3, "Solution Found!",
-                fontsize=14, fontweight='bold', color='green',
-                transform=ax.transAxes)
+        else:
+            # Keep search decisions and the narrowings that settle a value
+            events = trace['events']
+            steps = [event for event in events
+                     if event['event'] != 'narrow' or event['fixed']]
+            note = (f"{trace['total']} solver events for {solution.houses} houses; "
+                    f"{len(events) - len(steps)} partial narrowings not shown")
+            if trace['dropped']:
+                note += f"; the oldest {trace['dropped']} events were dropped"
+            ax.text(0.02, 0.97, note, fontsize=11, fontweight='bold',
+                    transform=ax.transAxes)
+            
+            # Two columns of numbered steps, eliding the middle of long traces
+            rows = STEP_ROWS * 2
+            numbered = list(enumerate(steps, 1))
+            if len(numbered) > rows:
+                numbered = numbered[:rows // 2 - 1] + [None] + numbered[-(rows // 2):]
+            for i, item in enumerate(numbered):
+                x = 0.02 + 0.5 * (i // STEP_ROWS)
+                y = 0.92 - (i % STEP_ROWS) * (0.9 / STEP_ROWS)
+                if item is None:
+                    ax.text(x, y, "...", fontsize=8, transform=ax.transAxes)
+                    continue
+                number, event = item
+                ax.text(x, y, f"{number}. {event['text']}", fontsize=8,
+                        color=STEP_COLORS[event['event']],
+                        fontweight='bold' if event['event'] == 'solution' else 'normal',
+                        transform=ax.transAxes)
         
         ax.axis('off')
         plt.title('Solution Process Timeline')
-        plt.show()
+        return self._finish(fig, 'step_by_step')
 
     def create_statistics(self):
         """Create a statistics visualization."""
@@ -238,6 +306,16 @@ class Visualization:
             ("Solutions Found", self.stats['solutions_found']),
             ("Execution Time (s)", f"{self.stats['execution_time']:.2f}")
         ]
+        search = self.stats['search']
+        if search is not None:
+            stats_data[-1] = ("Search Time (ms)", f"{search['search_seconds'] * 1000:.2f}")
+            stats_data.append(("Nodes Expanded", search['nodes']))
+            stats_data.append(("Backtracks", search['backtracks']))
+            # Most expensive constraints first
+            for row in search['constraints'][:3]:
+                stats_data.append((row['constraint'],
+                                   f"{row['calls']} calls, {row['rejections']} rejections, "
+                                   f"{row['seconds'] * 1000:.3f} ms"))
         
         # Create table
         table_data = [[f"{key}", f"{value}"] for key, value in stats_data]
@@ -253,218 +331,123 @@ class Visualization:
         
         ax.axis('off')
         plt.title('Solution Statistics')
-        plt.show()
+        return self._finish(fig, 'statistics')
 
     def create_summary(self, solution):
-        """Create a summary visualization highlighting key relationships."""
+        """Create a summary of the answer and of which clues it depends on."""
+        solution = HouseTable.from_rows(solution)
         fig, ax = plt.subplots(figsize=(12, 8))
         
-        # Find key relationships
-        zebra_house = solution['pet'].index('zebra') + 1
-        water_house = solution['drink'].index('water') + 1
-        
-        # Create summary points
-        summary_points = [
-            f"The zebra is in house {zebra_house}",
-            f"Water is drunk in house {water_house}",
-            "Key relationships:",
-            "- The Englishman lives in the red house",
-            "- The Spaniard owns the dog",
-            "- The Norwegian lives in the first house"
-        ]
-        
-        # Create summary visualization
+        # Lead with the questions the puzzle asks
+        summary_points = []
+        zebra_house = solution.house_of('zebra')
+        if zebra_house is not None:
+            summary_points.append(f"The zebra is in house {zebra_house}")
+        water_house = solution.house_of('water')
+        if water_house is not None:
+            summary_points.append(f"Water is drunk in house {water_house}")
+        if not summary_points:
+            summary_points.append(f"Solved {solution.houses} houses")
+        
+        # Clue necessity from analysis.analyze_clues()
+        clues = self.stats.get('clues')
+        if clues is None:
+            summary_points.append("Clue analysis was not run")
+        else:
+            checks = clues['checks']
+            summary_points.append(
+                f"{len(clues['necessary'])} of {len(checks)} clues are necessary; "
+                f"a minimal set needs {len(clues['minimal'])}")
+            summary_points.append("Necessary clues (and what removing them would allow):")
+            for check in checks:
+                if check['redundant']:
+                    continue
+                alternative = check['alternative']
+                moved = [value for value, house in alternative.items()
+                         if solution.house_of(value) != house]
+                if not moved:
+                    # Only an alternative equal to the solution shown; nothing moves
+                    summary_points.append(f"- {check['text']}")
+                    continue
+                # Prefer the facts the puzzle asks about
+                moved.sort(key=lambda value: value not in ('zebra', 'water'))
+                summary_points.append(
+                    f"- {check['text']} (else {moved[0]} could be in house "
+                    f"{alternative[moved[0]]})")
+            redundant = [check['text'] for check in checks if check['redundant']]
+            if redundant:
+                summary_points.append("Redundant clues:")
+                summary_points.extend(f"- {text}" for text in redundant)
+        
+        # Create summary visualization, tightening the spacing for long reports
+        step = min(0.1, 0.9 / len(summary_points))
         for i, point in enumerate(summary_points):
             if i == 0:
-                ax.text(0.1, 0.9 - i*0.1, point,
+                ax.text(0.05, 0.95 - i*step, point,
                         fontsize=14, fontweight='bold',
                         transform=ax.transAxes)
             else:
-                ax.text(0.1, 0.9 - i*0.1, point,
-                        fontsize=12,
+                ax.text(0.05, 0.95 - i*step, point,
+                        fontsize=12 if step >= 0.05 else 9,
                         transform=ax.transAxes)
         
         ax.axis('off')
         plt.title('Solution Summary')
-        plt.show()
+        return self._finish(fig, 'summary')
 
 def create_house_layout(solution):
     """Create a visual layout of the houses and their attributes."""
-    fig, ax = plt.subplots(figsize=(15, 8))
-    
-    # Create house positions
-    house_positions = {
-        1: (1, 0),
-        2: (2, 0),
-        3: (3, 0),
-        4: (4, 0),
-        5: (5, 0)
-    }
-    
-    # Create custom colormap for houses
-    colors = ['red', 'green', 'ivory', 'yellow', 'blue']
-    
-    # Draw houses
-    for house_num in range(1, 6):
-        x, y = house_positions[house_num]
-        house_color = solution['color'][house_num-1]
-        
-        # Draw house
-        rect = Rectangle((x-0.4, y-0.4), 0.8, 0.8, 
-                        edgecolor='black', facecolor=house_color, alpha=0.7)
-        ax.add_patch(rect)
-        
-        # Add house number
-        ax.text(x, y+0.4, f'House {house_num}', ha='center', va='center', 
-                fontsize=12, fontweight='bold')
-        
-        # Add attributes
-        attributes = [
-            ("Nationality", solution['nationality'][house_num-1]),
-            ("Color", solution['color'][house_num-1]),
-            ("Candy", solution['candy'][house_num-1]),
-            ("Drink", solution['drink'][house_num-1]),
-            ("Pet", solution['pet'][house_num-1])
-        ]
-        
-        for i, (attr, value) in enumerate(attributes):
-            ax.text(x, y-0.2-i*0.2, f"{attr}: {value}", ha='center', va='center',
-                    fontsize=10)
-    
-    ax.set_xlim(0, 6)
-    ax.set_ylim(-2, 2)
-    ax.axis('off')
-    plt.title('Zebra Puzzle Solution Layout')
-    plt.show()
+    Visualization().create_house_layout(solution)
 
-def create_constraint_graph():
+def create_constraint_graph(spec=None):
     """Create a graph showing the relationships between constraints."""
-    G = nx.DiGraph()
-    
-    # Add nodes
-    nodes = {
-        'nationalities': ['Englishman', 'Spaniard', 'Norwegian', 'Ukrainian', 'Japanese'],
-        'colors': ['red', 'green', 'ivory', 'yellow', 'blue'],
-        'candies': ['Hershey', 'Kit Kat', 'Smarties', 'Snickers', 'Milky Way'],
-        'drinks': ['water', 'orange juice', 'tea', 'coffee', 'milk'],
-        'pets': ['dog', 'fox', 'snails', 'horse', 'zebra']
-    }
-    
-    # Add nodes to graph
-    for category in nodes:
-        for item in nodes[category]:
-            G.add_node(item)
-    
-    # Add edges based on constraints
-    constraints = [
-        ('Englishman', 'red'),  # The Englishman lives in the red house
-        ('Spaniard', 'dog'),   # The Spaniard owns the dog
-        ('Norwegian', 'first'),  # The Norwegian lives in the first house
-        ('green', 'ivory'),    # The green house is immediately to the right of the ivory house
-        ('Hershey', 'fox'),    # The man who eats Hershey bars lives in the house next to the man with the fox
-        ('Kit Kat', 'yellow'),  # Kit Kats are eaten in the yellow house
-        ('Norwegian', 'blue'),  # The Norwegian lives next to the blue house
-        ('Smarties', 'snails'),  # The Smarties eater owns snails
-        ('Snickers', 'orange juice'),  # The Snickers eater drinks orange juice
-        ('Ukrainian', 'tea'),  # The Ukrainian drinks tea
-        ('Japanese', 'Milky Way'),  # The Japanese eats Milky Ways
-        ('Kit Kat', 'horse'),  # Kit Kats are eaten in a house next to the house where the horse is kept
-        ('coffee', 'green'),   # Coffee is drunk in the green house
-        ('milk', 'middle')     # Milk is drunk in the middle house
-    ]
-    
-    # Add edges to graph
-    for edge in constraints:
-        G.add_edge(edge[0], edge[1])
-    
-    # Draw graph
-    pos = nx.spring_layout(G)
-    plt.figure(figsize=(12, 8))
-    
-    # Draw nodes with different colors for each category
-    colors = {
-        'nationalities': 'lightblue',
-        'colors': 'lightgreen',
-        'candies': 'lightyellow',
-        'drinks': 'lightpink',
-        'pets': 'lightgray'
-    }
-    
-    for category in nodes:
-        nx.draw_networkx_nodes(G, pos, 
-                             nodelist=nodes[category],
-                             node_color=colors[category],
-                             node_size=2000)
-    
-    nx.draw_networkx_edges(G, pos, width=1.5, alpha=0.5)
-    nx.draw_networkx_labels(G, pos, font_size=10, font_weight='bold')
-    
-    plt.title('Constraint Relationships')
-    plt.axis('off')
-    plt.show()
+    Visualization().create_constraint_graph(spec)
 
 def create_solution_matrix(solution):
     """Create a matrix showing the final solution."""
-    categories = ['Nationality', 'Color', 'Candy', 'Drink', 'Pet']
-    houses = range(1, 6)
-    
-    # Create matrix
-    matrix = np.zeros((5, 5), dtype=object)
-    
-    for i, house in enumerate(houses):
-        matrix[0, i] = solution['nationality'][i]
-        matrix[1, i] = solution['color'][i]
-        matrix[2, i] = solution['candy'][i]
-        matrix[3, i] = solution['drink'][i]
-        matrix[4, i] = solution['pet'][i]
-    
-    # Create figure and axis
-    fig, ax = plt.subplots(figsize=(12, 8))
-    
-    # Create table data
-    table_data = []
-    # Add empty header row
-    table_data.append([''] + ['House 1', 'House 2', 'House 3', 'House 4', 'House 5'])
-    
-    # Add category names as first column
-    for i, category in enumerate(categories):
-        row_data = [category] + [str(item) for item in matrix[i]]
-        table_data.append(row_data)
-    
-    # Create table
-    table = ax.table(cellText=table_data, loc='center', cellLoc='center')
-    
-    # Adjust table properties
-    for (row, col), cell in table.get_celld().items():
-        if row == 0 or col == 0:  # Header row or first column
-            cell.set_text_props(weight='bold', color='w')
-            cell.set_facecolor('#40465e')
-        else:
-            if row % 2 == 0:
-                cell.set_facecolor('#f1f1f1')
-            else:
-                cell.set_facecolor('w')
-    
-    # Add color coding for each category
-    category_colors = {
-        'Nationality': '#e3f2fd',
-        'Color': '#e8f5e9',
-        'Candy': '#fff3e0',
-        'Drink': '#fce4ec',
-        'Pet': '#f3f3f3'
-    }
-    
-    # Apply colors to cells
-    for i, category in enumerate(categories):
-        for j in range(1, 6):
-            table[(i+1, j)].set_facecolor(category_colors[category])
-    
-    # Hide axes
-    ax.axis('off')
-    
-    plt.title('Zebra Puzzle Solution Matrix')
-    plt.show()
+    Visualization().create_solution_matrix(solution)
+
+def render_report(solution, stats, output_dir, formats=('png',), analyze=False):
+    """Render every figure headless into ``output_dir``; returns the paths.
+
+    With ``analyze``, the clue analysis of ``stats['spec']`` for the
+    summary runs here first, so a background render does not hold up the
+    caller with it.
+    """
+    visualizer = Visualization(output_dir, formats)
+    visualizer.stats.update(stats)
+    solution = HouseTable.from_rows(solution)
+    if analyze:
+        from analysis import analyze_clues
+        shown = {value: house for category in solution
+                 for house, value in enumerate(solution[category], 1)}
+        visualizer.update_analysis(analyze_clues(stats['spec'], solution=shown))
+    return visualizer.render_all(solution)
+
+_render_pool = None
+_pending_renders = []
+
+def _init_render_worker():
+    plt.switch_backend('Agg')
+
+def render_in_background(solution, stats, output_dir, formats=('png',), analyze=False):
+    """Queue ``render_report`` in a worker process and return its Future.
+
+    The caller returns immediately; figures, and with ``analyze`` the
+    clue analysis they show, are computed asynchronously.
+    Use ``wait_for_renders()`` to block until every queued report is done.
+    """
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = ProcessPoolExecutor(max_workers=1, initializer=_init_render_worker)
+    future = _render_pool.submit(render_report, solution, dict(stats), output_dir,
+                                 tuple(formats), analyze)
+    _pending_renders.append(future)
+    return future
 
-# Update requirements.txt
-with open('requirements.txt', 'a') as f:
-    f.write('matplotlib==3.7.1\nnetworkx==3.1\nnumpy==1.24.3\n')
+def wait_for_renders(timeout=None):
+    """Block until every background render finishes; returns the paths."""
+    paths = []
+    while _pending_renders:
+        paths.extend(_pending_renders.pop(0).result(timeout))
+    return paths
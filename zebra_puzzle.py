@@ -1,148 +1,131 @@
-from constraint import Problem, AllDifferentConstraint
-from visualization import Visualization
-
-def solve_zebra_puzzle():
-    # Create the problem instance
-    problem = Problem()
-    
-    # Define the variables and their domains
-    houses = range(1, 6)  # 1 to 5
-    
-    # Nationalities
-    nationalities = ['Englishman', 'Spaniard', 'Norwegian', 'Ukrainian', 'Japanese']
-    problem.addVariables(nationalities, houses)
-    
-    # Colors
-    colors = ['red', 'green', 'ivory', 'yellow', 'blue']
-    problem.addVariables(colors, houses)
-    
-    # Candies
-    candies = ['Hershey', 'Kit Kat', 'Smarties', 'Snickers', 'Milky Way']
-    problem.addVariables(candies, houses)
-    
-    # Drinks
-    drinks = ['water', 'orange juice', 'tea', 'coffee', 'milk']
-    problem.addVariables(drinks, houses)
-    
-    # Pets
-    pets = ['dog', 'fox', 'snails', 'horse', 'zebra']
-    problem.addVariables(pets, houses)
-    
-    # Add all different constraints
-    problem.addConstraint(AllDifferentConstraint(), nationalities)
-    problem.addConstraint(AllDifferentConstraint(), colors)
-    problem.addConstraint(AllDifferentConstraint(), candies)
-    problem.addConstraint(AllDifferentConstraint(), drinks)
-    problem.addConstraint(AllDifferentConstraint(), pets)
-    
-    # Add specific constraints
-    # The Englishman lives in the red house
-    problem.addConstraint(lambda e, r: e == r, ('Englishman', 'red'))
-    
-    # The Spaniard owns the dog
-    problem.addConstraint(lambda s, d: s == d, ('Spaniard', 'dog'))
-    
-    # The Norwegian lives in the first house
-    problem.addConstraint(lambda n: n == 1, ('Norwegian',))
-    
-    # The green house is immediately to the right of the ivory house
-    problem.addConstraint(lambda g, i: g == i + 1, ('green', 'ivory'))
-    
-    # The man who eats Hershey bars lives in the house next to the man with the fox
-    problem.addConstraint(lambda h, f: abs(h - f) == 1, ('Hershey', 'fox'))
-    
-    # Kit Kats are eaten in the yellow house
-    problem.addConstraint(lambda k, y: k == y, ('Kit Kat', 'yellow'))
-    
-    # The Norwegian lives next to the blue house
-    problem.addConstraint(lambda n, b: abs(n - b) == 1, ('Norwegian', 'blue'))
-    
-    # The Smarties eater owns snails
-    problem.addConstraint(lambda s, sn: s == sn, ('Smarties', 'snails'))
-    
-    # The Snickers eater drinks orange juice
-    problem.addConstraint(lambda s, o: s == o, ('Snickers', 'orange juice'))
-    
-    # The Ukrainian drinks tea
-    problem.addConstraint(lambda u, t: u == t, ('Ukrainian', 'tea'))
-    
-    # The Japanese eats Milky Ways
-    problem.addConstraint(lambda j, m: j == m, ('Japanese', 'Milky Way'))
-    
-    # Kit Kats are eaten in a house next to the house where the horse is kept
-    problem.addConstraint(lambda k, h: abs(k - h) == 1, ('Kit Kat', 'horse'))
-    
-    # Coffee is drunk in the green house
-    problem.addConstraint(lambda c, g: c == g, ('coffee', 'green'))
-    
-    # Milk is drunk in the middle house
-    problem.addConstraint(lambda m: m == 3, ('milk',))
-    
-    # Get solutions
-    solutions = problem.getSolutions()
-    
+from house_table import HouseTable
+from puzzle_spec import ENGINES, STOCK_SPEC, load_spec, compile_spec, category_label, clue_text
+from solve_trace import Trace
+
+# How solve_zebra_puzzle() renders its figures:
+#   'show'        interactive matplotlib windows (blocks until closed)
+#   'files'       headless, written to output_dir before returning
+#   'background'  headless, written by a worker process after returning
+#   None          no figures at all
+RENDER_MODES = ('show', 'files', 'background', None)
+
+def __getattr__(name):
+    # Keep `from zebra_puzzle import Visualization` working without an eager import
+    if name == 'Visualization':
+        from visualization import Visualization
+        return Visualization
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def format_solution(table):
+    """The answer lines and the full house table for a ``HouseTable``, as printed."""
+    lines = ["", "Solution:", "-" * 50]
+
+    # Find where the zebra and water are
+    zebra_house = table.house_of('zebra')
+    if zebra_house is not None:
+        lines.append(f"The zebra is in house {zebra_house}")
+    water_house = table.house_of('water')
+    if water_house is not None:
+        lines.append(f"Water is drunk in house {water_house}")
+    lines.append("-" * 50)
+
+    # Column widths fit the longest heading or value in each category
+    widths = [
+        max(len(category_label(category)), *(len(value) for value in values))
+        for category, values in table.items()
+    ]
+
+    # Full solution
+    lines.extend(["", "Full solution:"])
+    header = ["House"] + [
+        f"{category_label(category):{width}}"
+        for category, width in zip(table, widths)
+    ]
+    lines.append(" | ".join(header).rstrip())
+    lines.append("-" * max(50, len(" | ".join(header))))
+    for house in range(1, table.houses + 1):
+        row = [f"{house:5}"]
+        for category, width in zip(table, widths):
+            row.append(f"{table.value(category, house):{width}}")
+        lines.append(" | ".join(row))
+    return "\n".join(lines)
+
+def solve_zebra_puzzle(spec_path=STOCK_SPEC, render='show', output_dir='figures',
+                       formats=('png',), engine='auto'):
+    if render not in RENDER_MODES:
+        raise ValueError(f"render must be one of {RENDER_MODES}, got {render!r}")
+
+    # Load the puzzle description and compile it into a reusable plan
+    spec = load_spec(spec_path)
+    plan = compile_spec(spec)
+    problem = plan.solver
+
+    categories = spec['categories']
+
+    # Get the first solution and the solution count without keeping the rest;
+    # when figures are wanted, also trace the solver's steps in bounded memory
+    search_stats = plan.new_stats(trace=Trace() if render is not None else None)
+    solution, solutions_found = plan.first_and_count(stats=search_stats, engine=engine)
+
     # Format and print the solution
-    if solutions:
-        solution = solutions[0]
-        
-        # Find where the zebra and water are
-        zebra_house = solution['zebra']
-        water_house = solution['water']
-        
-        print("\nSolution:")
-        print("-" * 50)
-        print(f"The zebra is in house {zebra_house}")
-        print(f"Water is drunk in house {water_house}")
-        print("-" * 50)
-        
-        # Print full solution
-        print("\nFull solution:")
-        print("House | Nationality | Color | Candy | Drink | Pet")
-        print("-" * 50)
-        
-        # Prepare data for visualization
-        solution_data = {
-            'nationality': [],
-            'color': [],
-            'candy': [],
-            'drink': [],
-            'pet': []
-        }
-        
-        for house in houses:
-            nationality = next(k for k, v in solution.items() if v == house and k in nationalities)
-            color = next(k for k, v in solution.items() if v == house and k in colors)
-            candy = next(k for k, v in solution.items() if v == house and k in candies)
-            drink = next(k for k, v in solution.items() if v == house and k in drinks)
-            pet = next(k for k, v in solution.items() if v == house and k in pets)
-            
-            solution_data['nationality'].append(nationality)
-            solution_data['color'].append(color)
-            solution_data['candy'].append(candy)
-            solution_data['drink'].append(drink)
-            solution_data['pet'].append(pet)
-            
-            print(f"{house:5} | {nationality:11} | {color:5} | {candy:9} | {drink:13} | {pet:6}")
-        
-        # Create visualizations
+    if solution is not None:
+
+        # Index the solution by (category, house) in one pass; the same
+        # table feeds the printer and every visualization
+        solution_data = HouseTable(solution, categories, spec['houses'])
+        print(format_solution(solution_data))
+
+        if render is None:
+            return solution
+
+        # Create visualizations; the plotting stack is only imported here so
+        # that solving alone never pays matplotlib/networkx/numpy start-up
+        from environment import check_environment
+        for warning in check_environment():
+            print(f"Warning: {warning}")
+        from visualization import Visualization, render_in_background
         print("\nGenerating visualizations...")
-        visualizer = Visualization()
-        
+        headless = render != 'show'
+        visualizer = Visualization(output_dir if headless else None, formats)
+
         # Update statistics
-        num_constraints = len(problem._constraints)
-        num_variables = len(problem._variables)
-        solutions_found = len(solutions)
-        visualizer.update_stats(num_constraints, num_variables, solutions_found)
-        
-        # Create all visualizations
-        visualizer.create_house_layout(solution_data)
-        visualizer.create_constraint_graph()
-        visualizer.create_solution_matrix(solution_data)
-        visualizer.create_step_by_step(solution_data)
-        visualizer.create_statistics()
-        visualizer.create_summary(solution_data)
+        num_constraints = problem.num_constraints
+        num_variables = problem.num_variables
+        visualizer.update_stats(num_constraints, num_variables, solutions_found, search_stats)
+        visualizer.update_spec(spec)
+        visualizer.update_trace(search_stats.trace.as_dict(
+            problem, [clue_text(clue) for clue in spec['clues']]))
+
+        # Create all visualizations; the summary needs to know which clues
+        # the solution depends on, which a background render works out itself
+        if render == 'background':
+            render_in_background(solution_data, visualizer.stats, output_dir, formats,
+                                 analyze=True)
+            print(f"Rendering figures to {output_dir} in the background")
+        else:
+            from analysis import analyze_clues
+            visualizer.update_analysis(analyze_clues(spec, solution=solution))
+            written = visualizer.render_all(solution_data)
+            if written:
+                print(f"Wrote {len(written)} figures to {output_dir}")
+        return solution
     else:
         print("No solution found")
+        return None
 
 if __name__ == "__main__":
-    solve_zebra_puzzle()
+    import argparse
+    parser = argparse.ArgumentParser(description="Solve a Zebra-style puzzle")
+    parser.add_argument('spec', nargs='?', default=STOCK_SPEC,
+                        help="puzzle spec file (.json or .toml)")
+    parser.add_argument('--render', choices=['show', 'files', 'background', 'none'],
+                        default='show', help="how to produce the figures (default: show)")
+    parser.add_argument('--output-dir', default='figures',
+                        help="directory for headless figures (default: figures)")
+    parser.add_argument('--format', dest='formats', action='append', choices=['png', 'svg', 'pdf'],
+                        help="file format for headless figures, repeatable (default: png)")
+    parser.add_argument('--engine', choices=ENGINES, default='auto',
+                        help="solving backend (default: auto, picked by puzzle size)")
+    args = parser.parse_args()
+    solve_zebra_puzzle(args.spec, None if args.render == 'none' else args.render,
+                       args.output_dir, tuple(args.formats or ('png',)), args.engine)